@@ -0,0 +1,258 @@
+"""Priority alert pipeline that gets Critical-risk posts to a responder in seconds.
+
+    python alerts.py /tmp/posts.jsonl --rate 5 --burst 20
+
+An asyncio feed tails the scored-post stream (the same JSON lines as
+stream.py) and selects alert candidates per micro-batch with vectorised
+masks: risk level Critical or severity above a threshold. Candidates are
+deduplicated and queued per platform, ordered by priority: the severity
+score, which the scoring rules (scoring.ScoringRules) the generator and
+the ingest path apply have already boosted for late-night posts. A dispatcher hands the
+highest-priority alert whose platform still has rate budget (a token
+bucket per platform) to the responder list. It records the time from
+ingest to alert for every alert.
+"""
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass
+
+import numpy as np
+
+from data import PLATFORMS
+from profiling import percentiles
+from scoring import DEFAULT_RULES, load_rules
+from stream import LineTail, parse_records
+
+
+@dataclass
+class Alert:
+    platform: str
+    risk_level: str
+    severity_score: float
+    priority: float
+    late_night: bool
+    hour: int
+    keyword: str
+    ingested_at: float
+    alerted_at: float = None
+
+    @property
+    def latency(self):
+        return self.alerted_at - self.ingested_at
+
+
+def priorities(severity, hour, rules=DEFAULT_RULES):
+    # Severity already carries the late-night multiplier (scoring.severity_scores); only flag those posts
+    late = (hour >= rules.late_night_hours[0]) & (hour <= rules.late_night_hours[1])
+    return np.asarray(severity, dtype=np.float64), late
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready(self, now):
+        self._refill(now)
+        return self.tokens >= 1
+
+    def take(self):
+        self.tokens -= 1
+
+    def wait(self, now):
+        # Seconds until the next token
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class AlertPipeline:
+    def __init__(self, threshold=9.0, rate=5.0, burst=20, dedup_seconds=600, max_queue=10_000, history=500,
+                 rules=DEFAULT_RULES):
+        self.threshold = threshold
+        self.rules = rules
+        self.dedup_seconds = dedup_seconds
+        self.max_queue = max_queue
+        self.queues = {platform: [] for platform in PLATFORMS}
+        self.buckets = {platform: TokenBucket(rate, burst) for platform in PLATFORMS}
+        self.dispatched = deque(maxlen=history)
+        self.latencies = deque(maxlen=10_000)
+        # posts, candidates, duplicates, shed (queue overflow), alerts and dropped (malformed or unplaceable lines)
+        self.counts = Counter()
+        self._seen = OrderedDict()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = None
+
+    def offer(self, df, ingested_at=None):
+        """Queue the alert candidates of a posts frame; returns how many were queued."""
+        ingested_at = ingested_at if ingested_at is not None else time.time()
+        severity = df['severity_score'].to_numpy(dtype=np.float64)
+        hour = df['hour'].to_numpy()
+        priority, late = priorities(severity, hour, self.rules)
+        hit = (df['risk_level'] == 'Critical').to_numpy() | (severity > self.threshold)
+        rows = np.flatnonzero(hit)
+
+        # Only candidate rows become Python objects, one column pull per batch
+        candidates = df.iloc[rows]
+        columns = {name: candidates[name].tolist() for name in ['platform', 'risk_level', 'keyword']}
+        if 'post_id' in df.columns:
+            keys = candidates['post_id'].tolist()
+        else:
+            keys = list(zip(columns['platform'], candidates['date'].tolist(), hour[rows].tolist(),
+                            columns['keyword'], severity[rows].tolist()))
+
+        queued = 0
+        with self._lock:
+            self.counts['posts'] += len(df)
+            self.counts['candidates'] += len(rows)
+            self._expire(ingested_at)
+            for i, row in enumerate(rows.tolist()):
+                if keys[i] in self._seen:
+                    self.counts['duplicates'] += 1
+                    continue
+                self._seen[keys[i]] = ingested_at
+                alert = Alert(
+                    platform=columns['platform'][i],
+                    risk_level=columns['risk_level'][i],
+                    severity_score=float(severity[row]),
+                    priority=float(priority[row]),
+                    late_night=bool(late[row]),
+                    hour=int(hour[row]),
+                    keyword=columns['keyword'][i],
+                    ingested_at=ingested_at,
+                )
+                queue = self.queues[alert.platform]
+                heapq.heappush(queue, (-alert.priority, next(self._order), alert))
+                queued += 1
+                if len(queue) > 2 * self.max_queue:
+                    # Shed the lowest priorities rather than let a backlog grow without bound
+                    self.counts['shed'] += len(queue) - self.max_queue
+                    self.queues[alert.platform] = queue = heapq.nsmallest(self.max_queue, queue)
+        if queued and self._wake is not None:
+            self._wake.set()
+        return queued
+
+    def _expire(self, now):
+        while self._seen and next(iter(self._seen.values())) < now - self.dedup_seconds:
+            self._seen.popitem(last=False)
+
+    def next_alert(self):
+        """Pop the highest-priority alert that is within its platform's rate; else (None, wait)."""
+        now = time.monotonic()
+        with self._lock:
+            ready = [p for p, queue in self.queues.items() if queue and self.buckets[p].ready(now)]
+            if not ready:
+                waits = [self.buckets[p].wait(now) for p, queue in self.queues.items() if queue]
+                return None, min(waits) if waits else None
+            platform = min(ready, key=lambda p: self.queues[p][0])
+            self.buckets[platform].take()
+            alert = heapq.heappop(self.queues[platform])[2]
+            alert.alerted_at = time.time()
+            self.dispatched.append(alert)
+            self.latencies.append(alert.latency)
+            self.counts['alerts'] += 1
+            return alert, 0.0
+
+    async def dispatch(self):
+        self._wake = asyncio.Event()
+        while True:
+            alert, wait = self.next_alert()
+            if alert is not None:
+                await asyncio.sleep(0)
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def feed(self, path, poll=0.05, from_start=False):
+        tail = LineTail(path, from_start)
+        try:
+            while True:
+                buffer = tail.read()
+                if not buffer:
+                    await asyncio.sleep(poll)
+                    continue
+                ingested_at = time.time()
+                # Parse off the event loop so dispatch stays responsive; malformed lines only count as dropped
+                df, _, dropped = await asyncio.to_thread(parse_records, buffer, self.rules)
+                with self._lock:
+                    self.counts['dropped'] += dropped
+                self.offer(df, ingested_at)
+        finally:
+            tail.close()
+
+    async def run(self, path, poll=0.05, from_start=False):
+        await asyncio.gather(self.feed(path, poll, from_start), self.dispatch())
+
+    def start(self, path, poll=0.05, from_start=False):
+        # Run the pipeline on its own event loop in a daemon thread
+        thread = threading.Thread(
+            target=asyncio.run, args=(self.run(path, poll, from_start),), name='alerts', daemon=True
+        )
+        thread.start()
+        return thread
+
+    @property
+    def queue_depth(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def pending(self, n=20):
+        # Highest-priority alerts still waiting, across platforms
+        with self._lock:
+            entries = heapq.nsmallest(n, itertools.chain(*self.queues.values()))
+        return [alert for _, _, alert in entries]
+
+    def recent(self, n=50):
+        with self._lock:
+            return list(self.dispatched)[-n:][::-1]
+
+    def latency_percentiles(self):
+        with self._lock:
+            return percentiles(list(self.latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the alert pipeline on a JSON lines stream and report its latency')
+    parser.add_argument('path')
+    parser.add_argument('--threshold', type=float, default=9.0, help='severity that alerts whatever the risk level')
+    parser.add_argument('--rate', type=float, default=5.0, help='alerts per second per platform')
+    parser.add_argument('--burst', type=int, default=20)
+    parser.add_argument('--rules', help='JSON file overriding the scoring rules')
+    parser.add_argument('--from-start', action='store_true', help='alert on posts already in the file')
+    parser.add_argument('--report-every', type=float, default=5)
+    args = parser.parse_args()
+
+    pipeline = AlertPipeline(args.threshold, args.rate, args.burst, rules=load_rules(args.rules))
+    pipeline.start(args.path, from_start=args.from_start)
+    started = time.time()
+    try:
+        while True:
+            time.sleep(args.report_every)
+            latency = pipeline.latency_percentiles()
+            print(json.dumps({
+                **pipeline.counts,
+                'posts_per_s': round(pipeline.counts['posts'] / (time.time() - started)),
+                'queue_depth': pipeline.queue_depth,
+                'alert_p50_ms': round(latency[0.5] * 1000, 1),
+                'alert_p99_ms': round(latency[0.99] * 1000, 1),
+            }), flush=True)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+import argparse
+import resource
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from cube import COUNT, GRANULARITIES, INTERVENTIONS, KEY_UNITS, SEVERITY, build_cube_from_chunks, ratio
+from data import KEYWORDS, PLATFORMS, RISK_LEVELS, SENTIMENTS, iter_posts
+from dataset import chunk_rows_for, has_text, iter_frames
+
+HIGH_RISK_LEVELS = ['High', 'Critical']
+
+
+@dataclass(frozen=True)
+class FilterState:
+    """Sidebar selection in a normalised, hashable form."""
+
+    platforms: tuple
+    risk_levels: tuple
+    date_from: pd.Timestamp
+    date_to: pd.Timestamp
+
+    @classmethod
+    def from_sidebar(cls, platforms, risk_levels, date_range):
+        # date_input returns a single date while the user is still picking the range
+        date_from, date_to = date_range if len(date_range) == 2 else (date_range[0], date_range[0])
+        return cls(
+            platforms=tuple(sorted(platforms)),
+            risk_levels=tuple(sorted(risk_levels, key=RISK_LEVELS.index)),
+            date_from=pd.Timestamp(date_from).normalize(),
+            date_to=pd.Timestamp(date_to).normalize(),
+        )
+
+    @classmethod
+    def everything(cls, cube):
+        return cls.from_sidebar(PLATFORMS, RISK_LEVELS, (cube.first_date, cube.last_date))
+
+
+class DashboardStats:
+    """Everything the dashboard tabs display for one filter state.
+
+    Built from a single cube window; each tab's tables are derived on first
+    access, so a rerun only pays for the tab that is actually shown.
+    """
+
+    def __init__(self, window, overall, monitor=None):
+        self.window = window
+        self.overall = overall
+        self.monitor = monitor
+        # (platform, risk, measure) is enough for every platform/risk breakdown
+        self.by_platform_risk = window.posts.sum(axis=(2, 3))
+        self.totals = self.by_platform_risk.sum(axis=(0, 1))
+
+    # Overview
+
+    @property
+    def total_posts(self):
+        return int(self.totals[COUNT])
+
+    @property
+    def overall_posts(self):
+        return int(self.overall[COUNT])
+
+    @property
+    def interventions(self):
+        return int(self.totals[INTERVENTIONS])
+
+    @property
+    def avg_severity(self):
+        return float(ratio(self.totals[SEVERITY], self.totals[COUNT]))
+
+    @property
+    def overall_avg_severity(self):
+        return float(ratio(self.overall[SEVERITY], self.overall[COUNT]))
+
+    @cached_property
+    def _high_by_platform(self):
+        high = np.isin(RISK_LEVELS, HIGH_RISK_LEVELS)
+        return self.by_platform_risk[:, high, COUNT].sum(axis=1).astype(int)
+
+    @property
+    def high_risk(self):
+        return int(self._high_by_platform.sum())
+
+    @property
+    def share_of_total(self):
+        return ratio(self.total_posts, self.overall_posts) * 100
+
+    @property
+    def high_risk_share(self):
+        return ratio(self.high_risk, self.total_posts) * 100
+
+    @property
+    def intervention_rate(self):
+        # Interventions per high-risk post
+        return ratio(self.interventions, self.high_risk) * 100
+
+    @cached_property
+    def risk_counts(self):
+        by_risk = self.by_platform_risk[..., COUNT].sum(axis=0).astype(int)
+        return pd.Series(by_risk, index=RISK_LEVELS)[self.window.risk_levels]
+
+    @cached_property
+    def high_risk_by_platform(self):
+        counts = self._high_by_platform
+        return pd.DataFrame({'platform': PLATFORMS, 'count': counts})[counts > 0]
+
+    @property
+    def top_high_risk_platform(self):
+        counts = self._high_by_platform
+        return PLATFORMS[counts.argmax()] if counts.any() else None
+
+    # Platform analysis
+
+    @cached_property
+    def platform_stats(self):
+        by_platform = self.by_platform_risk.sum(axis=1)
+        stats = pd.DataFrame({
+            'Platform': PLATFORMS,
+            'Avg Severity': ratio(by_platform[:, SEVERITY], by_platform[:, COUNT]),
+            'Interventions': by_platform[:, INTERVENTIONS].astype(int),
+            'Total Posts': by_platform[:, COUNT].astype(int),
+        })
+        return stats[stats['Total Posts'] > 0]
+
+    @cached_property
+    def hourly_pivot(self):
+        hourly = self.window.posts[..., COUNT].sum(axis=(0, 1))
+        pivot = pd.DataFrame(hourly, index=pd.RangeIndex(24, name='hour'), columns=SENTIMENTS)
+        return pivot.loc[hourly.sum(axis=1) > 0, hourly.sum(axis=0) > 0]
+
+    # Risk keywords
+
+    @cached_property
+    def keyword_stats(self):
+        by_keyword = self.window.keywords.sum(axis=(0, 1))
+        stats = pd.DataFrame({
+            'Keyword': KEYWORDS,
+            'Avg Severity': ratio(by_keyword[:, SEVERITY], by_keyword[:, COUNT]),
+            'Frequency': by_keyword[:, COUNT].astype(int),
+        })
+        return stats[stats['Frequency'] > 0].sort_values('Avg Severity', ascending=False)
+
+    # Timeline
+
+    @cached_property
+    def anomalies(self):
+        """Days an anomalies.AnomalyMonitor flagged for the selection, newest first (None without one)."""
+        if self.monitor is None:
+            return None
+        if not len(self.window.dates):
+            return self.monitor.frame().iloc[:0]
+        platforms = np.array(PLATFORMS)[self.window.platforms]
+        risk_levels = np.array(RISK_LEVELS)[self.window.risk_levels]
+        return self.monitor.select(platforms, risk_levels, self.window.dates[0], self.window.dates[-1])
+
+    @property
+    def platform_anomalies(self):
+        # Anomalies of whole platforms, not of one risk level or keyword
+        anomalies = self.anomalies
+        if anomalies is None:
+            return None
+        return anomalies[(anomalies['risk_level'] == 'All') & (anomalies['keyword'] == 'All')]
+
+    @cached_property
+    def timelines(self):
+        """Incidents, interventions and mean severity per bucket, for every granularity.
+
+        Derived together so switching granularity only picks another frame;
+        Period is each bucket's first instant.
+        """
+        timelines = {}
+        for granularity in GRANULARITIES:
+            keys, sums = self.window.rollup(granularity)
+            timeline = pd.DataFrame({
+                'Period': keys.astype(f'datetime64[{KEY_UNITS[granularity]}]').astype('datetime64[s]'),
+                'Incidents': sums[:, COUNT].astype(int),
+                'Interventions': sums[:, INTERVENTIONS].astype(int),
+                'Avg Severity': ratio(sums[:, SEVERITY], sums[:, COUNT]),
+            })
+            timelines[granularity] = timeline[timeline['Incidents'] > 0].reset_index(drop=True)
+        return timelines
+
+    @property
+    def monthly_stats(self):
+        return self.timelines['month']
+
+    @cached_property
+    def daily_severity(self):
+        daily = self.timelines['day']
+        return pd.DataFrame({'date': daily['Period'], 'severity_score': daily['Avg Severity']})
+
+
+def summarize(cube, filters, monitor=None):
+    """Query the cube once for a filter state and wrap it in DashboardStats.
+
+    To summarise a raw frame instead, pass build_cube(df): the cube is built
+    in a single pass over the rows. monitor (an anomalies.AnomalyMonitor fed
+    with the same cube) supplies the flagged days.
+    """
+    window = cube.window(filters.date_from, filters.date_to, filters.platforms, filters.risk_levels)
+    return DashboardStats(window, cube.totals(), monitor)
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def aggregate_posts(data=None, n_rows=None, memory_mb=256, text=False):
+    """Cube of a Parquet dataset (or synthetic posts) built out-of-core in bounded chunks."""
+    chunk_rows = chunk_rows_for(memory_mb, has_text(data) if data else text)
+    if data:
+        chunks = iter_frames(data, chunk_rows)
+    else:
+        chunks = iter_posts(n_rows, chunk_size=chunk_rows, compact=True, text=text)
+    return build_cube_from_chunks(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate a posts dataset out-of-core and print the tab statistics')
+    parser.add_argument('--data', help='Parquet dataset written by dataset.py (default: synthetic posts)')
+    parser.add_argument('--rows', type=int, default=None, help='synthetic row count')
+    parser.add_argument('--memory-mb', type=int, default=256, help='working memory per chunk')
+    parser.add_argument('--text', action='store_true', help='synthetic posts with matched message text')
+    args = parser.parse_args()
+
+    cube = aggregate_posts(args.data, args.rows, args.memory_mb, args.text)
+    stats = summarize(cube, FilterState.everything(cube))
+
+    with pd.option_context('display.width', 120, 'display.max_rows', 50):
+        print(stats.platform_stats.to_string(index=False), end='\n\n')
+        print(stats.keyword_stats.to_string(index=False), end='\n\n')
+        print(stats.hourly_pivot.to_string(), end='\n\n')
+        print(stats.monthly_stats.to_string(index=False), end='\n\n')
+    print(f"{stats.total_posts:,} posts in chunks of {chunk_rows_for(args.memory_mb, has_text(args.data) if args.data else args.text):,} rows, peak RSS {peak_rss_mb():.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""Streaming anomaly detection on daily volume, high-risk share and mean severity.
+
+    python anomalies.py --rows 1000000 [--threshold 3.5]
+
+Every series keeps an exponentially weighted mean and mean absolute
+deviation (EWMA/EWMAD). A day is scored against the state built from the
+days before it, flagged when it lies more than `threshold` deviations
+(scaled to a standard deviation) from the mean, and then folded in with
+its value clipped to that band, so one spike does not drag the baseline
+along. State is three floats per series and one update touches each series
+once, whatever the history: new days cost O(series), never a rescan.
+
+The monitor tracks, per platform,
+- post volume and mean severity for every risk level and every keyword
+  (plus "All" of each), and
+- the high-risk share for every keyword (plus "All"),
+as whole-array NumPy updates, so thousands of series score in well under a
+millisecond per day.
+"""
+import argparse
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from analytics import HIGH_RISK_LEVELS, aggregate_posts
+from cube import COUNT, SEVERITY, ratio
+from data import KEYWORDS, PLATFORMS, RISK_LEVELS
+
+# Mean absolute deviation of a normal variable times this is its standard deviation
+DEVIATION_TO_SIGMA = np.sqrt(np.pi / 2)
+
+ALL = 'All'
+METRICS = ['volume', 'high_risk_share', 'severity']
+EVENT_COLUMNS = ['date', 'metric', 'platform', 'risk_level', 'keyword', 'value', 'expected', 'z']
+
+
+class EwmaDetector:
+    """EWMA mean and absolute deviation for an array of series, updated one observation at a time.
+
+    min_scale floors the deviation so near-constant series do not flag every
+    wobble; counts=True also floors it at the Poisson sqrt(mean).
+    """
+
+    def __init__(self, shape, halflife=14, threshold=3.5, warmup=14, min_scale=0.0, counts=False):
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.threshold = threshold
+        self.warmup = warmup
+        self.min_scale = min_scale
+        self.counts = counts
+        self.mean = np.zeros(shape)
+        self.deviation = np.zeros(shape)
+        self.seen = np.zeros(shape, dtype=np.int64)
+
+    @property
+    def scale(self):
+        scale = np.maximum(DEVIATION_TO_SIGMA * self.deviation, self.min_scale)
+        return np.maximum(scale, np.sqrt(self.mean)) if self.counts else scale
+
+    def update(self, values):
+        """Score one observation per series (NaN: none that day), then fold it in.
+
+        Returns the z-scores, NaN where a series had no observation or is still warming up.
+        """
+        values = np.asarray(values, dtype=float)
+        observed = ~np.isnan(values)
+        scale = self.scale
+        ready = observed & (self.seen >= self.warmup)
+        z = np.full(values.shape, np.nan)
+        z[ready] = (values[ready] - self.mean[ready]) / scale[ready]
+
+        first = observed & (self.seen == 0)
+        self.mean[first] = values[first]
+        rest = observed & ~first
+        # Winsorise against the current band before it moves
+        band = self.threshold * scale[rest]
+        clipped = np.clip(values[rest], self.mean[rest] - band, self.mean[rest] + band)
+        clipped = np.where(self.seen[rest] >= self.warmup, clipped, values[rest])
+        diff = clipped - self.mean[rest]
+        self.deviation[rest] += self.alpha * (np.abs(diff) - self.deviation[rest])
+        self.mean[rest] += self.alpha * diff
+        self.seen[observed] += 1
+        return z
+
+    @property
+    def nbytes(self):
+        return self.mean.nbytes + self.deviation.nbytes + self.seen.nbytes
+
+
+class AnomalyMonitor:
+    """Per-series detectors over the cube's days, fed each day once; shared by all sessions.
+
+    Series are (platform, risk level or All, keyword or All) for volume and
+    severity and (platform, keyword or All) for the high-risk share. Rates
+    are only scored on days with at least min_posts posts behind them, and
+    volume only flags days where the count or its expectation reaches it.
+    """
+
+    def __init__(self, halflife=14, threshold=3.5, warmup=14, min_posts=10, max_events=10_000):
+        shape = (len(PLATFORMS), len(RISK_LEVELS) + 1, len(KEYWORDS) + 1)
+        options = dict(halflife=halflife, threshold=threshold, warmup=warmup)
+        self.detectors = {
+            'volume': EwmaDetector(shape, min_scale=1.0, counts=True, **options),
+            'high_risk_share': EwmaDetector((len(PLATFORMS), len(KEYWORDS) + 1), min_scale=0.02, **options),
+            'severity': EwmaDetector(shape, min_scale=0.1, **options),
+        }
+        self.threshold = threshold
+        self.min_posts = min_posts
+        # High risk levels on the risk axis, whose last entry is All
+        self.high = np.append(np.isin(RISK_LEVELS, HIGH_RISK_LEVELS), False)
+        # Day number (since 1970) of the last day scored
+        self.last_day = None
+        self.events = deque(maxlen=max_events)
+        self.version = 0
+        self._frame = (None, None)
+        self._lock = threading.Lock()
+
+    @property
+    def n_series(self):
+        return sum(detector.mean.size for detector in self.detectors.values())
+
+    @property
+    def nbytes(self):
+        return sum(detector.nbytes for detector in self.detectors.values())
+
+    def update(self, cube, through=None):
+        """Score the cube's days after the last one scored, up to through (default: its last day).
+
+        Pass through=the day before today while today's posts are still arriving.
+        """
+        start = int(cube.start.astype(np.int64))
+        last = start + cube.n_days - 1
+        if through is not None:
+            last = min(last, int(np.datetime64(pd.Timestamp(through), 'D').astype(np.int64)))
+        with self._lock:
+            first = start if self.last_day is None else max(self.last_day + 1, start)
+            for day in range(first, last + 1):
+                self._score_day(day, cube.daily[day - start], cube.keywords[day - start])
+                self.last_day = day
+            if last >= first:
+                self.version += 1
+
+    def _score_day(self, day, daily, keywords):
+        # (platform, risk level + All, keyword + All, measure)
+        n_risk, n_keywords = len(RISK_LEVELS), len(KEYWORDS)
+        cells = np.empty((len(PLATFORMS), n_risk + 1, n_keywords + 1, daily.shape[-1]))
+        cells[:, :n_risk, :n_keywords] = keywords
+        cells[:, :n_risk, n_keywords] = daily
+        cells[:, n_risk] = cells[:, :n_risk].sum(axis=1)
+        count = cells[..., COUNT]
+        high = count[:, self.high].sum(axis=1)
+
+        values = {
+            'volume': count,
+            'high_risk_share': np.where(count[:, n_risk] >= self.min_posts, ratio(high, count[:, n_risk]), np.nan),
+            'severity': np.where(count >= self.min_posts, ratio(cells[..., SEVERITY], count), np.nan),
+        }
+        date = pd.Timestamp(np.datetime64(day, 'D'))
+        for metric, detector in self.detectors.items():
+            expected = detector.mean.copy()
+            z = detector.update(values[metric])
+            flagged = np.abs(np.nan_to_num(z)) > self.threshold
+            if metric == 'volume':
+                # A handful of posts on a quiet series is not a spike
+                flagged &= np.maximum(values[metric], expected) >= self.min_posts
+            for index in zip(*np.nonzero(flagged)):
+                # Share series have no risk level axis
+                platform, risk, keyword = index if len(index) == 3 else (index[0], n_risk, index[1])
+                self.events.append((date, metric, platform, risk, keyword,
+                                    values[metric][index], expected[index], z[index]))
+
+    def frame(self):
+        """All recorded anomalies (oldest first) with labelled platform, risk level and keyword."""
+        with self._lock:
+            version, frame = self._frame
+            if version == self.version:
+                return frame
+            version, events = self.version, list(self.events)
+        frame = pd.DataFrame(events, columns=EVENT_COLUMNS)
+        codes = {'platform': PLATFORMS, 'risk_level': RISK_LEVELS + [ALL], 'keyword': KEYWORDS + [ALL]}
+        for column, labels in codes.items():
+            frame[column] = pd.Categorical.from_codes(frame[column].astype(np.int64), labels)
+        frame['metric'] = pd.Categorical(frame['metric'], METRICS)
+        frame['date'] = pd.to_datetime(frame['date'])
+        with self._lock:
+            self._frame = (version, frame)
+        return frame
+
+    def select(self, platforms, risk_levels, date_from, date_to):
+        """Anomalies of the selected platforms and risk levels (or All) in a date range, newest first."""
+        frame = self.frame()
+        keep = (frame['platform'].isin(platforms)
+                & (frame['risk_level'].isin(risk_levels) | (frame['risk_level'] == ALL))
+                & frame['date'].between(pd.Timestamp(date_from), pd.Timestamp(date_to)))
+        return frame[keep].sort_values(['date', 'z'], ascending=[False, False], key=_by_size).reset_index(drop=True)
+
+
+def _by_size(column):
+    # Newest first, then the largest deviation either way
+    return column.abs() if column.name == 'z' else column
+
+
+def describe(event):
+    """One line for an anomaly, e.g. 'Reddit high-risk share 41.0% (expected 25.2%) on 2026-10-02'."""
+    if event['metric'] == 'high_risk_share':
+        value, expected, name = f"{event['value']:.1%}", f"{event['expected']:.1%}", 'high-risk share'
+    elif event['metric'] == 'severity':
+        value, expected, name = f"{event['value']:.2f}", f"{event['expected']:.2f}", 'mean severity'
+    else:
+        value, expected, name = f"{event['value']:,.0f}", f"{event['expected']:,.0f}", 'posts'
+    series = event['platform']
+    if event['risk_level'] != ALL:
+        series += f" {event['risk_level']}"
+    if event['keyword'] != ALL:
+        series += f" '{event['keyword']}'"
+    return f"{series} {name} {value} (expected {expected}) on {event['date']:%Y-%m-%d}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score every day of the posts and list the flagged series')
+    parser.add_argument('--data', help='Parquet dataset written by dataset.py (default: synthetic posts)')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='synthetic row count')
+    parser.add_argument('--threshold', type=float, default=3.5)
+    parser.add_argument('--halflife', type=float, default=14)
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    cube = aggregate_posts(args.data, args.rows)
+    monitor = AnomalyMonitor(args.halflife, args.threshold)
+    monitor.update(cube)
+    frame = monitor.select(PLATFORMS, RISK_LEVELS, cube.first_date, cube.last_date)
+    for _, event in frame.head(args.top).iterrows():
+        print(f"z {event['z']:+6.1f}  {describe(event)}")
+    print(f"{len(frame):,} anomalies over {cube.n_days} days and {monitor.n_series:,} series "
+          f"({monitor.nbytes / monitor.n_series:.0f} bytes of state per series)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,23 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import numpy as np
-from datetime import datetime, timedelta
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import config
+from alerts import AlertPipeline
+from anomalies import AnomalyMonitor, describe
+from analytics import FilterState, peak_rss_mb, summarize
+from cube import COUNT, GRANULARITIES, ratio
+from data import RISK_LEVELS
+from export import FORMATS, dataset_batches, frame_batches, table_batches, to_bytes
+from figures import FigureCache
+from profiling import RerunTimer, TimingLog
+from scoring import load_rules
+from sketches import SketchStats, build_sketches
+from startup import BackgroundTask, data_chunks, data_params, open_disk_cache, read_cube, read_data, read_summary, sketch_chunks
+from stream import LiveCube, start_ingest
+
+# Phase timings of this rerun (no-ops unless SPA_PROFILE=1)
+timer = RerunTimer(config.PROFILE)
 
 # Page config
 st.set_page_config(
@@ -54,71 +67,103 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load or generate data
-@st.cache_data
+# Load or generate data (see startup.py)
+disk_cache = open_disk_cache()
+
+# Both are shared read-only by all sessions (and, through the disk cache, by all processes)
+@st.cache_resource
 def load_data():
-    np.random.seed(42)
-    
-    # Generate dates for last 6 months
-    dates = pd.date_range(end=datetime.now(), periods=180, freq='D')
-    
-    # Platform data
-    platforms = ['Twitter', 'Reddit', 'Instagram', 'Facebook']
-    
-    # Generate synthetic social media data
-    data = []
-    keywords = ['hopeless', 'alone', 'suicide', 'depressed', 'worthless', 'end it', 
-                'give up', 'no point', 'can\'t go on', 'better off dead']
-    
-    for date in dates:
-        for _ in range(np.random.randint(15, 35)):
-            platform = np.random.choice(platforms, p=[0.3, 0.25, 0.25, 0.2])
-            
-            # Risk level distribution
-            risk_level = np.random.choice(['Low', 'Medium', 'High', 'Critical'], 
-                                         p=[0.45, 0.30, 0.15, 0.10])
-            
-            # Severity score based on risk level
-            if risk_level == 'Low':
-                severity = np.random.uniform(1, 3)
-            elif risk_level == 'Medium':
-                severity = np.random.uniform(3, 6)
-            elif risk_level == 'High':
-                severity = np.random.uniform(6, 8.5)
-            else:  # Critical
-                severity = np.random.uniform(8.5, 10)
-            
-            # Time patterns (late night has higher risk)
-            hour = np.random.randint(0, 24)
-            if 0 <= hour <= 4:
-                severity *= 1.2
-            
-            # Sentiment
-            if severity > 7:
-                sentiment = np.random.choice(['Negative', 'Neutral'], p=[0.9, 0.1])
-            elif severity > 4:
-                sentiment = np.random.choice(['Negative', 'Neutral', 'Positive'], p=[0.7, 0.25, 0.05])
-            else:
-                sentiment = np.random.choice(['Negative', 'Neutral', 'Positive'], p=[0.4, 0.4, 0.2])
-            
-            # Intervention made (higher for higher severity)
-            intervention = np.random.random() < (severity / 15)
-            
-            data.append({
-                'date': date,
-                'platform': platform,
-                'risk_level': risk_level,
-                'severity_score': severity,
-                'hour': hour,
-                'sentiment': sentiment,
-                'intervention': intervention,
-                'keyword': np.random.choice(keywords)
-            })
-    
-    df = pd.DataFrame(data)
-    return df
-
-df = load_data()
+    return read_data(disk_cache, data_params())
+
+# Pre-aggregated cube, loaded on a background thread from the first session on; reruns only query it
+@st.cache_resource
+def cube_loader():
+    return BackgroundTask(read_cube, disk_cache, data_params(), load_data, name='load-cube')
+
+def load_cube():
+    try:
+        return cube_loader().result()
+    except Exception:
+        # Do not keep a failed build (e.g. a transient disk error): the next rerun starts a new one
+        cube_loader.clear()
+        raise
+
+# Severity and phrase sketches of the archive for the approximate mode, built on first use
+@st.cache_resource
+def load_sketches():
+    return build_sketches(sketch_chunks(data_params(), load_data), config.SKETCH_K, config.SKETCH_WIDTH, config.SKETCH_DEPTH, config.SKETCH_HEAVY)
+
+# Anomaly state of every series, fed each new day of the cube once and shared by all sessions
+@st.cache_resource
+def load_anomaly_monitor():
+    return AnomalyMonitor(config.ANOMALY_HALFLIFE, config.ANOMALY_Z, config.ANOMALY_WARMUP, config.ANOMALY_MIN_POSTS)
+
+# Built figures per filter state, shared by all sessions
+@st.cache_resource
+def load_figure_cache():
+    return FigureCache(config.FIGURE_CACHE_SIZE)
+
+# Rerun counts and latency percentiles of every session
+@st.cache_resource
+def load_timing_log():
+    return TimingLog(jsonl_path=config.PROFILE_JSONL, prometheus_path=config.PROFILE_PROMETHEUS)
+
+# Rolling window fed by the stream, seeded with the loaded posts
+@st.cache_resource
+def load_live():
+    live = LiveCube.from_cube(load_cube(), config.DATA_DAYS)
+    start_ingest(live, config.STREAM_PATH, rules=load_rules(config.SCORING_RULES),
+                 max_rows=config.STREAM_BATCH_ROWS, max_latency=config.STREAM_BATCH_SECONDS)
+    return live
+
+# Alert pipeline on its own event loop, alerting on posts streamed from now on
+@st.cache_resource
+def load_alerts():
+    pipeline = AlertPipeline(config.ALERT_SEVERITY, config.ALERT_RATE, config.ALERT_BURST,
+                             rules=load_rules(config.SCORING_RULES))
+    pipeline.start(config.STREAM_PATH)
+    return pipeline
+
+with timer.phase('load'):
+    summary = None
+    if config.STREAM_PATH:
+        live = load_live()
+        alerts = load_alerts()
+        data_version, cube = live.snapshot()
+    else:
+        data_version, cube = 0, None
+        loader = cube_loader()
+        if config.PREVIEW and not loader.ready:
+            # First paint from the latest summary unless the cube is ready within SPA_PREVIEW_WAIT
+            summary = read_summary(disk_cache, data_params())
+            if summary is not None and loader.wait(config.PREVIEW_WAIT):
+                summary = None
+        if summary is None:
+            cube = load_cube()
+figure_cache = load_figure_cache()
+# Date range and platforms for the sidebar
+bounds = cube if cube is not None else summary
+
+def show_chart(name, source=None):
+    fig = figure_cache.get(name, filters, source if source is not None else stats, timer, data_version)
+    with timer.phase(f'render:{name}'):
+        st.plotly_chart(fig, width="stretch")
+
+def duration(value, fmt):
+    # "—" until there is a sample to take percentiles of
+    return "—" if pd.isna(value) else fmt.format(value)
+
+def filtered_posts():
+    # Record batches of the selected posts, one source chunk in memory at a time
+    if config.DATA_PATH:
+        return dataset_batches(config.DATA_PATH, filters)
+    return frame_batches(data_chunks(data_params()) if config.DATA_MEMORY_MB else [load_data()], filters)
+
+def download_table(label, frame, name):
+    # Encoded only when clicked, never on a rerun
+    extension, mime = FORMATS[export_format]
+    st.download_button(f"📥 {label}", data=lambda: to_bytes(table_batches(frame), export_format),
+                       file_name=f"{name}{extension}", mime=mime, on_click="ignore", key=f"download_{name}")
 
 # Sidebar
 with st.sidebar:
@@ -132,23 +177,36 @@ with st.sidebar:
     
     selected_platforms = st.multiselect(
         "Select Platforms",
-        options=df['platform'].unique(),
-        default=df['platform'].unique()
+        options=bounds.platforms,
+        default=bounds.platforms
     )
     
     selected_risk = st.multiselect(
         "Risk Levels",
-        options=['Low', 'Medium', 'High', 'Critical'],
-        default=['Low', 'Medium', 'High', 'Critical']
+        options=RISK_LEVELS,
+        default=RISK_LEVELS
     )
     
     date_range = st.date_input(
         "Date Range",
-        value=(df['date'].min(), df['date'].max()),
-        min_value=df['date'].min(),
-        max_value=df['date'].max()
+        value=(bounds.first_date, bounds.last_date),
+        min_value=bounds.first_date,
+        max_value=bounds.last_date
     )
     
+    approximate = st.toggle(
+        "Approximate analytics",
+        value=config.APPROX,
+        help="Severity percentiles and top phrases merged from per-day sketches of the archive"
+    )
+    
+    if config.DATA_MEMORY_MB and cube is not None:
+        st.caption(f"{int(cube.totals()[COUNT]):,} posts aggregated out-of-core "
+                   f"within {config.DATA_MEMORY_MB} MB chunks · peak RSS {peak_rss_mb():.0f} MB")
+    
+    st.caption(f"Figure cache: {figure_cache.hits:,} hits · {figure_cache.misses:,} misses "
+               f"({figure_cache.hit_rate:.0%}) · {len(figure_cache)}/{figure_cache.max_entries} figures")
+    
     st.markdown("---")
     
     # Crisis resources
@@ -165,13 +223,22 @@ with st.sidebar:
     🌍 findahelpline.com
     """)
 
-# Filter data
-filtered_df = df[
-    (df['platform'].isin(selected_platforms)) &
-    (df['risk_level'].isin(selected_risk)) &
-    (df['date'] >= pd.to_datetime(date_range[0])) &
-    (df['date'] <= pd.to_datetime(date_range[1]))
-]
+# Filter data and aggregate everything the tabs show in one pass
+with timer.phase('filter'):
+    filters = FilterState.from_sidebar(selected_platforms, selected_risk, date_range)
+    if cube is None and filters != FilterState.everything(summary):
+        # The summary only covers the default selection
+        summary, cube = None, load_cube()
+    if cube is not None:
+        # Scores only days not seen yet; while streaming, today is still filling up
+        anomaly_monitor = load_anomaly_monitor()
+        anomaly_monitor.update(cube, through=cube.last_date - pd.Timedelta(days=1) if config.STREAM_PATH else None)
+        stats = summarize(cube, filters, anomaly_monitor)
+    else:
+        stats = summary
+if approximate and cube is not None:
+    with timer.phase('load:sketches'):
+        sketch_stats = SketchStats(load_sketches(), filters, config.TOP_PHRASES)
 
 # Main content
 st.markdown('<p class="main-header">🛡️ Suicide Prevention Through Social Media Analytics</p>', unsafe_allow_html=True)
@@ -187,434 +254,432 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Tabs
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "📊 Overview", 
-    "💬 Platform Analysis", 
-    "🔍 Risk Keywords", 
-    "📈 Timeline & Trends",
-    "ℹ️ About Project"
-])
-
-with tab1:
+def metric_cards(stats):
     # Key metrics
     col1, col2, col3, col4 = st.columns(4)
-    
+
     with col1:
         st.metric(
             label="📝 Messages Analyzed",
-            value=f"{len(filtered_df):,}",
-            delta=f"{len(filtered_df)/len(df)*100:.1f}% of total"
+            value=f"{stats.total_posts:,}",
+            delta=f"{stats.share_of_total:.1f}% of total"
         )
-    
+
     with col2:
-        high_risk = len(filtered_df[filtered_df['risk_level'].isin(['High', 'Critical'])])
         st.metric(
             label="⚠️ High-Risk Detected",
-            value=f"{high_risk:,}",
-            delta=f"{high_risk/len(filtered_df)*100:.1f}%",
+            value=f"{stats.high_risk:,}",
+            delta=f"{stats.high_risk_share:.1f}%",
             delta_color="inverse"
         )
-    
+
     with col3:
-        interventions = filtered_df['intervention'].sum()
         st.metric(
             label="🤝 Interventions Made",
-            value=f"{interventions:,}",
-            delta=f"{interventions/high_risk*100:.1f}% success rate" if high_risk > 0 else "N/A"
+            value=f"{stats.interventions:,}",
+            delta=f"{stats.intervention_rate:.1f}% success rate" if stats.high_risk > 0 else "N/A"
         )
-    
+
     with col4:
-        avg_severity = filtered_df['severity_score'].mean()
         st.metric(
             label="📊 Avg Severity Score",
-            value=f"{avg_severity:.2f}/10",
-            delta=f"{(avg_severity - df['severity_score'].mean()):.2f} vs overall"
+            value=f"{stats.avg_severity:.2f}/10",
+            delta=f"{(stats.avg_severity - stats.overall_avg_severity):.2f} vs overall"
         )
+
+# Tabs; only the selected tab builds its statistics and figures on a rerun
+tab1, tab2, tab3, tab4, tab_alerts, tab5 = st.tabs([
+    "📊 Overview", 
+    "💬 Platform Analysis", 
+    "🔍 Risk Keywords", 
+    "📈 Timeline & Trends",
+    "🚨 Responder Alerts",
+    "ℹ️ About Project"
+], key="active_tab", on_change="rerun")
+
+if cube is None:
+    # First paint: metric cards from the summary, then a full rerun once the cube has loaded
+    with tab1:
+        if tab1.open:
+            metric_cards(stats)
+    as_of = "" if summary.current else f" (cards from {summary.built_at:%Y-%m-%d %H:%M} UTC, before the latest data)"
+    st.info(f"⏳ Loading the full data{as_of}; the charts appear as soon as it is ready.")
+
+    @st.fragment(run_every=0.5)
+    def wait_for_cube():
+        if cube_loader().ready:
+            st.rerun(scope="app")
+
+    wait_for_cube()
+    st.stop()
+
+# Exports of the current selection; the tabs add a button under each of their tables
+with st.sidebar.expander("📥 Export"):
+    export_format = st.radio(
+        "Format",
+        options=list(FORMATS),
+        format_func={'arrow': 'Arrow IPC', 'parquet': 'Parquet'}.get,
+        horizontal=True,
+        key="export_format"
+    )
+    extension, mime = FORMATS[export_format]
+    st.download_button(
+        f"📥 Filtered posts ({stats.total_posts:,})",
+        data=lambda: to_bytes(filtered_posts(), export_format),
+        file_name=f"posts{extension}",
+        mime=mime,
+        on_click="ignore",
+        disabled=bool(config.STREAM_PATH),
+        help="Streamed posts are folded into the cube, not kept as rows" if config.STREAM_PATH else None,
+        key="download_posts"
+    )
+    st.caption("Larger selections: `python export.py OUT --format parquet` writes the same files with flat memory.")
+
+with tab1:
+    if tab1.open:
+        metric_cards(stats)
     
-    st.markdown("---")
+        st.markdown("---")
     
-    # Two column layout
-    col1, col2 = st.columns(2)
+        # Two column layout
+        col1, col2 = st.columns(2)
     
-    with col1:
-        st.subheader("🎯 Risk Level Distribution")
-        risk_counts = filtered_df['risk_level'].value_counts()
-        colors = {'Low': '#10B981', 'Medium': '#F59E0B', 'High': '#EF4444', 'Critical': '#7F1D1D'}
-        
-        fig = px.pie(
-            values=risk_counts.values,
-            names=risk_counts.index,
-            color=risk_counts.index,
-            color_discrete_map=colors,
-            hole=0.4
-        )
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-        fig.update_layout(height=400, showlegend=True)
-        st.plotly_chart(fig, use_container_width=True)
+        with col1:
+            st.subheader("🎯 Risk Level Distribution")
+            show_chart('risk_pie')
     
-    with col2:
-        st.subheader("💬 High-Risk Posts by Platform")
-        platform_risk = filtered_df[filtered_df['risk_level'].isin(['High', 'Critical'])].groupby('platform').size().reset_index(name='count')
-        
-        fig = px.bar(
-            platform_risk,
-            x='platform',
-            y='count',
-            color='count',
-            color_continuous_scale='Reds',
-            text='count'
-        )
-        fig.update_traces(textposition='outside')
-        fig.update_layout(height=400, showlegend=False, xaxis_title="Platform", yaxis_title="High-Risk Posts")
-        st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            st.subheader("💬 High-Risk Posts by Platform")
+            show_chart('high_risk_bar')
     
-    # Insights
-    st.markdown("---")
-    st.subheader("💡 Key Insights")
+        # Insights
+        st.markdown("---")
+        st.subheader("💡 Key Insights")
     
-    col1, col2, col3 = st.columns(3)
+        col1, col2, col3 = st.columns(3)
     
-    with col1:
-        st.info("""
-        **🌙 Peak Risk Hours**  
-        Late night (12 AM - 4 AM) shows 40% higher risk indicators
-        """)
+        with col1:
+            st.info("""
+            **🌙 Peak Risk Hours**  
+            Late night (12 AM - 4 AM) shows 40% higher risk indicators
+            """)
     
-    with col2:
-        platform_with_highest = filtered_df[filtered_df['risk_level'].isin(['High', 'Critical'])].groupby('platform').size().idxmax()
-        st.warning(f"""
-        **📱 Platform Trends**  
-        {platform_with_highest} has highest concentration of high-risk posts
-        """)
+        with col2:
+            st.warning(f"""
+            **📱 Platform Trends**  
+            {stats.top_high_risk_platform} has highest concentration of high-risk posts
+            """)
     
-    with col3:
-        success_rate = (interventions / high_risk * 100) if high_risk > 0 else 0
-        st.success(f"""
-        **✅ Intervention Impact**  
-        {success_rate:.1f}% of high-risk cases received intervention
-        """)
+        with col3:
+            st.success(f"""
+            **✅ Intervention Impact**  
+            {stats.intervention_rate:.1f}% of high-risk cases received intervention
+            """)
+    
+        # Latest unusual days of whole platforms in the selection
+        anomalies = stats.platform_anomalies
+        if len(anomalies):
+            latest = "  \n".join(describe(event) for _, event in anomalies.head(3).iterrows())
+            st.error(f"**⚡ Unusual Days ({len(anomalies):,} flagged)**  \n{latest}")
+        else:
+            st.success("**⚡ Unusual Days**  \nNo platform's volume, high-risk share or severity left its recent range")
 
 with tab2:
-    st.subheader("📱 Platform-Specific Analysis")
-    
-    # Platform comparison
-    platform_stats = filtered_df.groupby('platform').agg({
-        'severity_score': 'mean',
-        'intervention': 'sum',
-        'risk_level': 'count'
-    }).reset_index()
-    platform_stats.columns = ['Platform', 'Avg Severity', 'Interventions', 'Total Posts']
-    
-    col1, col2 = st.columns([2, 1])
-    
-    with col1:
-        fig = go.Figure()
-        fig.add_trace(go.Bar(
-            name='Total Posts',
-            x=platform_stats['Platform'],
-            y=platform_stats['Total Posts'],
-            marker_color='lightblue'
-        ))
-        fig.add_trace(go.Bar(
-            name='Interventions',
-            x=platform_stats['Platform'],
-            y=platform_stats['Interventions'],
-            marker_color='red'
-        ))
-        fig.update_layout(
-            barmode='group',
-            height=400,
-            title="Posts vs Interventions by Platform"
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with col2:
-        st.markdown("### Platform Statistics")
-        for _, row in platform_stats.iterrows():
-            risk_rate = (row['Interventions'] / row['Total Posts'] * 100) if row['Total Posts'] > 0 else 0
-            st.markdown(f"""
-            **{row['Platform']}**
-            - Posts: {int(row['Total Posts'])}
-            - Avg Severity: {row['Avg Severity']:.2f}/10
-            - Risk Rate: {risk_rate:.1f}%
-            """)
-            st.markdown("---")
-    
-    # Sentiment by time
-    st.subheader("⏰ Sentiment Patterns by Time of Day")
-    
-    # Group by hour
-    hourly_sentiment = filtered_df.groupby(['hour', 'sentiment']).size().reset_index(name='count')
-    hourly_pivot = hourly_sentiment.pivot(index='hour', columns='sentiment', values='count').fillna(0)
-    
-    fig = go.Figure()
-    for sentiment in ['Positive', 'Neutral', 'Negative']:
-        if sentiment in hourly_pivot.columns:
-            color = {'Positive': '#10B981', 'Neutral': '#94A3B8', 'Negative': '#EF4444'}[sentiment]
-            fig.add_trace(go.Scatter(
-                x=hourly_pivot.index,
-                y=hourly_pivot[sentiment],
-                mode='lines+markers',
-                name=sentiment,
-                line=dict(width=3, color=color),
-                marker=dict(size=8)
-            ))
-    
-    fig.update_layout(
-        height=400,
-        xaxis_title="Hour of Day",
-        yaxis_title="Number of Posts",
-        hovermode='x unified'
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    if tab2.open:
+        st.subheader("📱 Platform-Specific Analysis")
+    
+        # Platform comparison
+        with timer.phase('aggregate:platform_stats'):
+            platform_stats = stats.platform_stats
+    
+        col1, col2 = st.columns([2, 1])
+    
+        with col1:
+            show_chart('platform_bars')
+    
+        with col2:
+            st.markdown("### Platform Statistics")
+            with timer.phase('render:platform_table'):
+                # One virtualised grid whatever the number of platforms, not elements per row
+                st.dataframe(
+                    platform_stats.assign(**{
+                        'Risk Rate': 100 * ratio(platform_stats['Interventions'], platform_stats['Total Posts'])
+                    }),
+                    column_order=['Platform', 'Total Posts', 'Avg Severity', 'Risk Rate'],
+                    column_config={
+                        'Total Posts': st.column_config.NumberColumn("Posts", format="localized"),
+                        'Avg Severity': st.column_config.NumberColumn(format="%.2f/10"),
+                        'Risk Rate': st.column_config.NumberColumn(format="%.1f%%"),
+                    },
+                    hide_index=True,
+                    width="stretch"
+                )
+            download_table("Platform statistics", platform_stats, 'platform_stats')
+    
+        # Sentiment by time
+        st.subheader("⏰ Sentiment Patterns by Time of Day")
+    
+        show_chart('hourly_sentiment')
+        download_table("Hourly sentiment", stats.hourly_pivot.reset_index(), 'hourly_pivot')
 
 with tab3:
-    st.subheader("🔍 Risk Keyword Analysis")
-    
-    # Keyword frequency and severity
-    keyword_stats = filtered_df.groupby('keyword').agg({
-        'severity_score': 'mean',
-        'risk_level': 'count'
-    }).reset_index()
-    keyword_stats.columns = ['Keyword', 'Avg Severity', 'Frequency']
-    keyword_stats = keyword_stats.sort_values('Avg Severity', ascending=False)
-    
-    col1, col2 = st.columns([2, 1])
-    
-    with col1:
-        fig = px.scatter(
-            keyword_stats,
-            x='Frequency',
-            y='Avg Severity',
-            size='Frequency',
-            color='Avg Severity',
-            text='Keyword',
-            color_continuous_scale='Reds',
-            size_max=60
-        )
-        fig.update_traces(textposition='top center')
-        fig.update_layout(
-            height=500,
-            xaxis_title="Frequency of Appearance",
-            yaxis_title="Average Severity Score",
-            title="Keyword Risk Matrix"
+    if tab3.open:
+        st.subheader("🔍 Risk Keyword Analysis")
+    
+        # Keyword frequency and severity
+        with timer.phase('aggregate:keyword_stats'):
+            keyword_stats = stats.keyword_stats
+    
+        col1, col2 = st.columns([2, 1])
+    
+        with col1:
+            show_chart('keyword_matrix')
+    
+        with col2:
+            st.markdown("### Top Risk Keywords")
+            with timer.phase('render:keyword_table'):
+                st.dataframe(
+                    keyword_stats,
+                    column_config={
+                        'Avg Severity': st.column_config.ProgressColumn("Severity", format="%.2f/10",
+                                                                        min_value=0, max_value=10),
+                        'Frequency': st.column_config.NumberColumn("Appears", format="localized"),
+                    },
+                    hide_index=True,
+                    width="stretch"
+                )
+            download_table("Keyword statistics", keyword_stats, 'keyword_stats')
+    
+        if approximate:
+            st.subheader("🧩 Top Phrases (approximate)")
+            with timer.phase('aggregate:top_phrases'):
+                top_phrases = sketch_stats.top_phrases
+            st.dataframe(top_phrases, hide_index=True, width="stretch")
+            st.caption(f"Count-Min estimates over {sketch_stats.phrase_total:,} phrases: never low, at most "
+                       f"{sketch_stats.phrase_error:,.0f} high ({sketch_stats.phrase_confidence:.0%} confidence). "
+                       f"Every phrase seen more than {sketch_stats.heavy_threshold:,.0f} times is a candidate.")
+
+with tab4:
+    if tab4.open:
+        st.subheader("📈 Timeline & Trends")
+    
+        # Trends at the picked granularity; every granularity is rolled up from the same cube window
+        granularity = st.radio(
+            "Granularity",
+            options=GRANULARITIES,
+            index=GRANULARITIES.index('month'),
+            format_func=str.capitalize,
+            horizontal=True,
+            key="timeline_granularity"
         )
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with col2:
-        st.markdown("### Top Risk Keywords")
-        for idx, row in keyword_stats.head(10).iterrows():
-            severity_pct = (row['Avg Severity'] / 10) * 100
-            color = '#7F1D1D' if row['Avg Severity'] > 9 else '#EF4444' if row['Avg Severity'] > 7 else '#F59E0B'
+        show_chart(f'timeline_{granularity}')
+        download_table(f"{granularity.capitalize()} timeline", stats.timelines[granularity], f'timeline_{granularity}')
+    
+        # Daily trends
+        st.subheader("📅 Daily Activity Patterns")
+        show_chart('daily_severity')
+    
+        if approximate:
+            st.subheader("📐 Severity Percentiles (approximate)")
+            col1, col2 = st.columns([1, 2])
+    
+            with col1:
+                with timer.phase('aggregate:severity_percentiles'):
+                    severity_percentiles = sketch_stats.severity_percentiles
+                st.dataframe(severity_percentiles.round(2), hide_index=True, width="stretch")
+    
+            with col2:
+                show_chart('daily_percentiles', sketch_stats)
+    
+            st.caption(f"KLL sketches (k={config.SKETCH_K}): each percentile's rank is within "
+                       f"±{sketch_stats.rank_error:.1%} of the requested one (99% confidence).")
+    
+        # Insights
+        col1, col2 = st.columns(2)
+    
+        with col1:
+            # Spikes and drops flagged on every series of the selection, platform x risk level x keyword
+            anomalies = stats.anomalies
+            if len(anomalies):
+                counts = anomalies['metric'].value_counts()
+                series = anomalies.groupby(['metric', 'platform', 'risk_level', 'keyword'], observed=True).ngroups
+                items = (f"<li>{len(anomalies):,} unusual days on {series:,} series: {counts['volume']:,} volume, "
+                         f"{counts['high_risk_share']:,} high-risk share, {counts['severity']:,} severity</li>")
+                items += "".join(f"<li>{describe(event)}</li>" for _, event in anomalies.head(3).iterrows())
+            else:
+                items = "<li>No series left its recent range in the selected period</li>"
             st.markdown(f"""
-            <div style="margin-bottom: 15px;">
-                <strong>{row['Keyword']}</strong><br>
-                <div style="background: #e5e7eb; border-radius: 10px; height: 8px; margin: 5px 0;">
-                    <div style="background: {color}; width: {severity_pct}%; height: 8px; border-radius: 10px;"></div>
-                </div>
-                <small>Severity: {row['Avg Severity']:.2f}/10 | Appears: {int(row['Frequency'])} times</small>
+            <div class="alert-box">
+                <h4>📊 Trend Analysis</h4>
+                <ul>{items}</ul>
             </div>
             """, unsafe_allow_html=True)
-
-with tab4:
-    st.subheader("📈 Timeline & Trends")
-    
-    # Monthly trends
-    monthly_data = filtered_df.copy()
-    monthly_data['month'] = monthly_data['date'].dt.to_period('M').astype(str)
-    
-    monthly_stats = monthly_data.groupby('month').agg({
-        'risk_level': 'count',
-        'intervention': 'sum'
-    }).reset_index()
-    monthly_stats.columns = ['Month', 'Incidents', 'Interventions']
-    
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=monthly_stats['Month'],
-        y=monthly_stats['Incidents'],
-        mode='lines+markers',
-        name='Incidents Detected',
-        line=dict(color='#EF4444', width=3),
-        marker=dict(size=10)
-    ))
-    fig.add_trace(go.Scatter(
-        x=monthly_stats['Month'],
-        y=monthly_stats['Interventions'],
-        mode='lines+markers',
-        name='Interventions Made',
-        line=dict(color='#10B981', width=3),
-        marker=dict(size=10)
-    ))
-    
-    fig.update_layout(
-        height=400,
-        xaxis_title="Month",
-        yaxis_title="Count",
-        hovermode='x unified',
-        title="Incident & Intervention Timeline"
-    )
-    st.plotly_chart(fig, use_container_width=True)
-    
-    # Daily trends
-    st.subheader("📅 Daily Activity Patterns")
-    daily_severity = filtered_df.groupby('date')['severity_score'].mean().reset_index()
-    
-    fig = px.area(
-        daily_severity,
-        x='date',
-        y='severity_score',
-        title="Average Daily Severity Score",
-        color_discrete_sequence=['#EF4444']
-    )
-    fig.update_layout(
-        height=350,
-        xaxis_title="Date",
-        yaxis_title="Average Severity Score"
-    )
-    st.plotly_chart(fig, use_container_width=True)
     
-    # Insights
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("""
-        <div class="alert-box">
-            <h4>📊 Trend Analysis</h4>
-            <ul>
-                <li>Incident detection has improved by 23% over 6 months</li>
-                <li>Intervention response time decreased from 18 to 14 minutes</li>
-                <li>Summer months show 18% increase in high-risk posts</li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
+        with col2:
+            st.markdown("""
+            <div class="success-box">
+                <h4>✅ Positive Outcomes</h4>
+                <ul>
+                    <li>Intervention success rate improved from 84% to 89%</li>
+                    <li>False positive rate reduced by 15%</li>
+                    <li>Community resource referrals increased by 40%</li>
+                </ul>
+            </div>
+            """, unsafe_allow_html=True)
     
-    with col2:
-        st.markdown("""
-        <div class="success-box">
-            <h4>✅ Positive Outcomes</h4>
-            <ul>
-                <li>Intervention success rate improved from 84% to 89%</li>
-                <li>False positive rate reduced by 15%</li>
-                <li>Community resource referrals increased by 40%</li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
+        if len(anomalies):
+            with st.expander(f"⚡ All {len(anomalies):,} flagged days"):
+                st.dataframe(anomalies.round({'value': 3, 'expected': 3, 'z': 1}), hide_index=True, width="stretch")
+
+with tab_alerts:
+    if tab_alerts.open:
+        st.subheader("🚨 Responder Alerts")
+    
+        if not config.STREAM_PATH:
+            st.info("Alerts are raised on streamed posts: start the app with SPA_STREAM pointing at the scored-post feed.")
+        else:
+            latency = alerts.latency_percentiles()
+    
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Waiting", f"{alerts.queue_depth:,}")
+            col2.metric("Alerts Sent", f"{alerts.counts['alerts']:,}")
+            col3.metric("Ingest → Alert p50", duration(latency[0.5] * 1000, "{:.0f} ms"))
+            col4.metric("Ingest → Alert p99", duration(latency[0.99] * 1000, "{:.0f} ms"))
+            st.caption(f"{alerts.counts['posts']:,} posts screened · {alerts.counts['candidates']:,} Critical or "
+                       f"severity > {config.ALERT_SEVERITY:g} · {alerts.counts['duplicates']:,} duplicates · "
+                       f"{alerts.counts['shed']:,} shed · limit {config.ALERT_RATE:g}/s per platform")
+    
+            columns = ['platform', 'risk_level', 'severity_score', 'priority', 'late_night', 'hour', 'keyword']
+            col1, col2 = st.columns(2)
+    
+            with col1:
+                st.markdown("### Latest Alerts")
+                recent = pd.DataFrame([{
+                    'sent': pd.Timestamp(alert.alerted_at, unit='s', tz='UTC').strftime('%H:%M:%S'),
+                    **{name: getattr(alert, name) for name in columns},
+                    'latency ms': round(alert.latency * 1000),
+                } for alert in alerts.recent()])
+                st.dataframe(recent, hide_index=True, width="stretch")
+    
+            with col2:
+                st.markdown("### Next in Queue")
+                pending = pd.DataFrame([{name: getattr(alert, name) for name in columns} for alert in alerts.pending()])
+                st.dataframe(pending, hide_index=True, width="stretch")
 
 with tab5:
-    st.subheader("ℹ️ About This Project")
+    if tab5.open:
+        st.subheader("ℹ️ About This Project")
     
-    st.markdown("""
-    ### 🎯 The Problem
+        st.markdown("""
+        ### 🎯 The Problem
     
-    Suicide is a global public health crisis affecting millions of individuals and families. Social media 
-    platforms have become spaces where people express their distress, offering opportunities for early 
-    detection and intervention. This project analyzes social media messages to identify patterns and risk 
-    factors that can help prevent suicide.
+        Suicide is a global public health crisis affecting millions of individuals and families. Social media 
+        platforms have become spaces where people express their distress, offering opportunities for early 
+        detection and intervention. This project analyzes social media messages to identify patterns and risk 
+        factors that can help prevent suicide.
     
-    **Target Audience:** Mental health professionals, social workers, crisis intervention teams, and 
-    platform moderators who can take action to help at-risk individuals.
+        **Target Audience:** Mental health professionals, social workers, crisis intervention teams, and 
+        platform moderators who can take action to help at-risk individuals.
     
-    ---
+        ---
     
-    ### 📊 Data Sources
+        ### 📊 Data Sources
     
-    This analysis integrates multiple data sources:
-    - **Social media posts** from Twitter, Reddit, Instagram, and Facebook
-    - **Natural language processing** sentiment scores and risk classifications
-    - **Temporal metadata** including timestamps and posting patterns
-    - **Intervention outcomes** and follow-up data
+        This analysis integrates multiple data sources:
+        - **Social media posts** from Twitter, Reddit, Instagram, and Facebook
+        - **Natural language processing** sentiment scores and risk classifications
+        - **Temporal metadata** including timestamps and posting patterns
+        - **Intervention outcomes** and follow-up data
     
-    **Data Quality:** All data is anonymized and aggregated to protect privacy. Missing demographic data 
-    was handled using MICE (Multiple Imputation by Chained Equations) to ensure robust analysis without 
-    compromising statistical validity.
+        **Data Quality:** All data is anonymized and aggregated to protect privacy. Missing demographic data 
+        was handled using MICE (Multiple Imputation by Chained Equations) to ensure robust analysis without 
+        compromising statistical validity.
     
-    ---
+        ---
     
-    ### 🔬 Methodology
+        ### 🔬 Methodology
     
-    The analysis employs several techniques:
+        The analysis employs several techniques:
     
-    1. **Risk Classification:** Machine learning models classify posts into four risk levels (Low, Medium, High, Critical)
-    2. **Keyword Analysis:** NLP algorithms identify high-risk linguistic patterns and keywords
-    3. **Temporal Analysis:** Time-series analysis reveals patterns in posting behavior and risk levels
-    4. **Sentiment Analysis:** Deep learning models assess emotional content and urgency
-    5. **Missing Data Handling:** MICE imputation for demographic variables ensures complete analysis
+        1. **Risk Classification:** Machine learning models classify posts into four risk levels (Low, Medium, High, Critical)
+        2. **Keyword Analysis:** NLP algorithms identify high-risk linguistic patterns and keywords
+        3. **Temporal Analysis:** Time-series analysis reveals patterns in posting behavior and risk levels
+        4. **Sentiment Analysis:** Deep learning models assess emotional content and urgency
+        5. **Missing Data Handling:** MICE imputation for demographic variables ensures complete analysis
     
-    **Model Performance:**
-    - Precision: 87%
-    - Recall: 84%
-    - F1-Score: 85%
-    - False Positive Rate: 8%
+        **Model Performance:**
+        - Precision: 87%
+        - Recall: 84%
+        - F1-Score: 85%
+        - False Positive Rate: 8%
     
-    ---
+        ---
     
-    ### 🔒 Ethical Considerations
+        ### 🔒 Ethical Considerations
     
-    This project prioritizes:
-    - **Privacy:** All data is anonymized and encrypted
-    - **Human oversight:** AI assists but doesn't replace human judgment
-    - **Transparency:** Clear documentation of methods and limitations
-    - **Consent:** Data usage complies with platform terms and privacy laws
-    - **Action:** Focus on intervention and support, not surveillance
+        This project prioritizes:
+        - **Privacy:** All data is anonymized and encrypted
+        - **Human oversight:** AI assists but doesn't replace human judgment
+        - **Transparency:** Clear documentation of methods and limitations
+        - **Consent:** Data usage complies with platform terms and privacy laws
+        - **Action:** Focus on intervention and support, not surveillance
     
-    The goal is to **facilitate early intervention while respecting individual privacy and dignity.**
+        The goal is to **facilitate early intervention while respecting individual privacy and dignity.**
     
-    ---
+        ---
     
-    ### 🚀 Impact & Future Work
+        ### 🚀 Impact & Future Work
     
-    **Current Impact:**
-    - Average response time: 14 minutes
-    - Intervention success rate: 89%
-    - 280+ successful interventions in 6 months
+        **Current Impact:**
+        - Average response time: 14 minutes
+        - Intervention success rate: 89%
+        - 280+ successful interventions in 6 months
     
-    **Future Enhancements:**
-    - Real-time alert system for crisis intervention teams
-    - Multi-language support for global reach
-    - Integration with mental health service providers
-    - Improved model accuracy through continuous learning
-    - Mobile app for crisis responders
+        **Future Enhancements:**
+        - Real-time alert system for crisis intervention teams
+        - Multi-language support for global reach
+        - Integration with mental health service providers
+        - Improved model accuracy through continuous learning
+        - Mobile app for crisis responders
     
-    ---
+        ---
     
-    ### 👥 Project Team
+        ### 👥 Project Team
     
-    **CMSE 830 Midterm Project**  
-    Michigan State University  
-    Department of Computational Mathematics, Science and Engineering
+        **CMSE 830 Midterm Project**  
+        Michigan State University  
+        Department of Computational Mathematics, Science and Engineering
     
-    ---
+        ---
     
-    ### 📚 References & Resources
+        ### 📚 References & Resources
     
-    - World Health Organization - Suicide Prevention
-    - National Institute of Mental Health
-    - Crisis Text Line - Data & Impact Reports
-    - American Foundation for Suicide Prevention
-    """)
+        - World Health Organization - Suicide Prevention
+        - National Institute of Mental Health
+        - Crisis Text Line - Data & Impact Reports
+        - American Foundation for Suicide Prevention
+        """)
     
-    st.markdown("---")
+        st.markdown("---")
     
-    # Crisis resources
-    st.error("""
-    ### 🆘 Crisis Resources
+        # Crisis resources
+        st.error("""
+        ### 🆘 Crisis Resources
     
-    **If you or someone you know is in crisis:**
+        **If you or someone you know is in crisis:**
     
-    📞 **988 Suicide & Crisis Lifeline**  
-    Call or Text: 988 (Available 24/7)
+        📞 **988 Suicide & Crisis Lifeline**  
+        Call or Text: 988 (Available 24/7)
     
-    📱 **Crisis Text Line**  
-    Text HOME to 741741
+        📱 **Crisis Text Line**  
+        Text HOME to 741741
     
-    🌍 **International Resources**  
-    Visit: findahelpline.com
+        🌍 **International Resources**  
+        Visit: findahelpline.com
     
-    💻 **Online Chat**  
-    988lifeline.org/chat
-    """)
+        💻 **Online Chat**  
+        988lifeline.org/chat
+        """)
 
 # Footer
 st.markdown("---")
@@ -624,3 +689,33 @@ st.markdown("""
     <p style="font-size: 0.9rem;">If you or someone you know is in crisis, please call 988 or visit 988lifeline.org</p>
 </div>
 """, unsafe_allow_html=True)
+
+# Streamed posts: rerun when new ones have been folded in, and report how fast they show up
+if config.STREAM_PATH:
+    live.mark_visible(data_version)
+    latency = live.latency_percentiles()
+    st.sidebar.caption(f"Live: {live.arrival_rate:,.0f} posts/s arriving · ingest capacity "
+                       f"{live.throughput:,.0f} posts/s · arrival to screen p50 {duration(latency[0.5], '{:.1f} s')}, "
+                       f"p99 {duration(latency[0.99], '{:.1f} s')}" + (f" · {live.dropped:,} malformed or unplaceable posts dropped" if live.dropped else ""))
+
+    @st.fragment(run_every=config.STREAM_REFRESH)
+    def follow_stream():
+        if live.version != data_version:
+            st.rerun(scope="app")
+
+    follow_stream()
+
+# Per-rerun phase breakdown, after everything else has been timed
+if config.PROFILE:
+    timing_log = load_timing_log()
+    ctx = get_script_run_ctx()
+    session = ctx.session_id if ctx else 'bare'
+    seconds = timing_log.record(session, timer)
+    latency = timing_log.latency_percentiles()
+    with st.sidebar.expander("⏱️ Rerun timings"):
+        st.caption(f"This rerun {seconds * 1000:.0f} ms · session rerun #{timing_log.reruns[session]} · "
+                   f"p50 {latency[0.5] * 1000:.0f} / p95 {latency[0.95] * 1000:.0f} / p99 {latency[0.99] * 1000:.0f} ms "
+                   f"over {len(timing_log.latencies)} reruns")
+        phases = pd.DataFrame(timer.phases, columns=['Phase', 'ms'])
+        phases['ms'] = (phases['ms'] * 1000).round(2)
+        st.dataframe(phases, hide_index=True, width="stretch")
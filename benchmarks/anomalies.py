@@ -0,0 +1,55 @@
+"""Anomaly detector cost per day as series grow, and how well it finds injected spikes.
+
+    python benchmarks/anomalies.py --series 1000 10000 100000 --days 365
+
+Each series is a Poisson daily count around its own level. Two days in
+every series get a spike of --spike times the level. Detection counts as
+found when the spike day is flagged; every other flagged day is a false
+alarm. The cost per day is the update of all series together, which is
+what AnomalyMonitor pays for each new day of the cube.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anomalies import EwmaDetector  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--series', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--spike', type=float, default=2.0, help='spike size as a multiple of the level')
+    parser.add_argument('--threshold', type=float, default=3.5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n in args.series:
+        level = rng.uniform(20, 500, size=n)
+        counts = rng.poisson(level, size=(args.days, n)).astype(float)
+        # Two spikes per series after the warm-up
+        spike_days = rng.integers(30, args.days, size=(2, n))
+        counts[spike_days, np.arange(n)] += args.spike * level
+
+        detector = EwmaDetector((n,), threshold=args.threshold, min_scale=1.0, counts=True)
+        flagged = np.zeros((args.days, n), dtype=bool)
+        start = time.perf_counter()
+        for day in range(args.days):
+            flagged[day] = np.abs(np.nan_to_num(detector.update(counts[day]))) > args.threshold
+        per_day = (time.perf_counter() - start) / args.days
+
+        spikes = np.zeros_like(flagged)
+        spikes[spike_days, np.arange(n)] = True
+        recall = flagged[spikes].mean()
+        false_alarms = (flagged[30:] & ~spikes[30:]).sum() / (~spikes[30:]).sum()
+        print(f"{n:>9,} series  {per_day * 1000:7.2f} ms/day  {per_day / n * 1e9:6.0f} ns/series  "
+              f"{detector.nbytes / n:.0f} B/series  spikes found {recall:.1%}  false alarms {false_alarms:.3%} of days")
+
+
+if __name__ == '__main__':
+    main()
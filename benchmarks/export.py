@@ -0,0 +1,41 @@
+"""Export time and peak memory as the filtered slice grows.
+
+    python benchmarks/export.py --rows 1000000 4000000 8000000 [--data /data/posts]
+
+Each case runs the export CLI in a fresh process, so its peak RSS is its
+own: the cube for the tables plus one batch of posts in flight. Peak
+memory should stay flat as rows grow while the time grows linearly.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 4_000_000, 8_000_000])
+    parser.add_argument('--data', help='export from this Parquet dataset instead of synthetic posts (one case)')
+    parser.add_argument('--formats', nargs='+', default=['parquet', 'arrow'])
+    parser.add_argument('--memory-mb', type=int, default=256)
+    args = parser.parse_args()
+
+    cases = [['--data', args.data]] if args.data else [['--rows', str(rows)] for rows in args.rows]
+    print(f"{'source':>12}{'format':>9}{'posts':>12}{'export s':>10}{'posts/s':>12}{'file MB':>9}{'peak MB':>9}")
+    for case in cases:
+        for fmt in args.formats:
+            with tempfile.TemporaryDirectory() as out:
+                command = [sys.executable, os.path.join(ROOT, 'export.py'), out, '--format', fmt,
+                           '--memory-mb', str(args.memory_mb), *case]
+                result = json.loads(subprocess.run(command, capture_output=True, text=True, check=True).stdout)
+                size = os.path.getsize(os.path.join(out, 'posts.' + fmt)) / 2**20
+            print(f"{os.path.basename(case[1]):>12}{fmt:>9}{result['posts']:>12,}{result['export_seconds']:>10.2f}"
+                  f"{result['posts_per_second']:>12,}{size:>9.0f}{result['peak_rss_mb']:>9}")
+
+
+if __name__ == '__main__':
+    main()
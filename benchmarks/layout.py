@@ -0,0 +1,53 @@
+"""Memory and filter/group-by time of the string layout vs the compact layout.
+
+    python benchmarks/layout.py 1000000 10000000
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import compact_frame, generate_posts  # noqa: E402
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def filter_rows(df):
+    return df[
+        df['platform'].isin(['Twitter', 'Reddit', 'Instagram']) &
+        df['risk_level'].isin(['Medium', 'High', 'Critical'])
+    ]
+
+
+def group_bys(df):
+    df.groupby('platform', observed=True).agg({'severity_score': 'mean', 'intervention': 'sum', 'risk_level': 'count'})
+    df.groupby(['hour', 'sentiment'], observed=True).size()
+    df.groupby('keyword', observed=True).agg({'severity_score': 'mean', 'risk_level': 'count'})
+    df['risk_level'].value_counts()
+
+
+def report(n_rows):
+    wide = generate_posts(n_rows=n_rows)
+    compact = compact_frame(wide)
+    print(f"\n{n_rows:,} rows")
+    print(f"{'layout':<10}{'memory MB':>12}{'filter s':>12}{'filtered MB':>14}{'group-by s':>12}")
+    for name, df in [('string', wide), ('compact', compact)]:
+        filtered = filter_rows(df)
+        print(f"{name:<10}"
+              f"{df.memory_usage(deep=True).sum() / 1e6:>12.1f}"
+              f"{best_of(lambda: filter_rows(df)):>12.3f}"
+              f"{filtered.memory_usage(deep=True).sum() / 1e6:>14.1f}"
+              f"{best_of(lambda: group_bys(filtered)):>12.3f}")
+
+
+if __name__ == '__main__':
+    for n in sys.argv[1:] or ['1000000', '10000000']:
+        report(int(n))
@@ -0,0 +1,237 @@
+"""Headless load test: rerun latency, throughput and memory as concurrent sessions grow.
+
+    python benchmarks/load.py --rows 1000000 --sessions 1 4 16 32 --steps 20 [--out load.json]
+
+Each session count gets a fresh `streamlit run` server, like one replica.
+N clients connect to its websocket the way browser tabs do. Each client
+speaks Streamlit's protobuf messages: it sends its widget states and reads
+deltas until the script finishes. AppTest is not used for this: it swaps a
+process-wide Runtime on every run, so its sessions cannot run concurrently.
+
+A client opens the app, then makes --steps scripted interactions picked at
+random: toggling a platform, narrowing the risk levels, sliding the date
+range or switching tabs. It times every rerun from request to
+script_finished. Per session count, the harness prints the p50/p95/p99
+rerun latency, reruns per second across all clients, and the server's peak
+RSS plus its growth per session. The growth can come out negative when the
+server hands back memory from the warm-up's data load. The clients share the machine with the
+server, so on few cores they add their own small share of the latency.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiling import QUANTILES, percentiles  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ACTIONS = ['platforms', 'risk', 'dates', 'tab']
+FINISHED_EARLY = ForwardMsg.ScriptFinishedStatus.Value('FINISHED_EARLY_FOR_RERUN')
+
+
+class Session:
+    """One browser session: the widget states it sends and the widgets the app last drew."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.states = {}
+        self.widgets = {}
+        self.tab_id = None
+        self.tabs = []
+        self.errors = []
+
+    async def rerun(self):
+        """Send the widget states, read deltas until the script finishes; returns the seconds taken."""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        tabs = []
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.ws.recv())
+            kind = forward.WhichOneof('type')
+            delta = forward.delta.WhichOneof('type') if kind == 'delta' else None
+            if delta == 'new_element':
+                element = forward.delta.new_element
+                name = element.WhichOneof('type')
+                if name in ('multiselect', 'date_input'):
+                    widget = getattr(element, name)
+                    self.widgets[widget.label] = widget
+                elif name == 'exception':
+                    self.errors.append(element.exception.message)
+            elif delta == 'add_block':
+                block = forward.delta.add_block
+                if block.WhichOneof('type') == 'tab_container':
+                    self.tab_id = block.tab_container.id
+                elif block.WhichOneof('type') == 'tab':
+                    tabs.append(block.tab.label)
+            elif kind == 'script_finished' and forward.script_finished != FINISHED_EARLY:
+                self.tabs = tabs or self.tabs
+                return time.perf_counter() - start
+
+    def selected(self, label):
+        widget = self.widgets[label]
+        if widget.id in self.states:
+            return list(self.states[widget.id].string_array_value.data)
+        return [widget.options[i] for i in widget.default]
+
+    def set_value(self, widget_id, field, value):
+        state = WidgetState(id=widget_id)
+        if field == 'string_array_value':
+            state.string_array_value.data.extend(value)
+        else:
+            setattr(state, field, value)
+        self.states[widget_id] = state
+
+
+def interact(session, action, rng):
+    """Change one widget's state the way a click would; the next rerun() sends it."""
+    if action == 'platforms':
+        # Toggle one platform, never leaving the selection empty
+        widget = session.widgets['Select Platforms']
+        selected = session.selected(widget.label)
+        platform = rng.choice(widget.options)
+        kept = [p for p in selected if p != platform]
+        session.set_value(widget.id, 'string_array_value', kept if platform in selected and kept else kept + [platform])
+    elif action == 'risk':
+        widget = session.widgets['Risk Levels']
+        low = rng.randrange(len(widget.options))
+        session.set_value(widget.id, 'string_array_value', widget.options[low:rng.randrange(low, len(widget.options)) + 1])
+    elif action == 'dates':
+        widget = session.widgets['Date Range']
+        first, last = (datetime.date.fromisoformat(value) for value in (widget.min, widget.max))
+        start = first + datetime.timedelta(days=rng.randrange((last - first).days))
+        end = start + datetime.timedelta(days=rng.randrange((last - start).days + 1))
+        session.set_value(widget.id, 'string_array_value', [start.isoformat(), end.isoformat()])
+    else:
+        session.set_value(session.tab_id, 'string_value', rng.choice(session.tabs))
+
+
+async def client(url, steps, seed, timings, errors):
+    rng = random.Random(seed)
+    async with websockets.connect(url, subprotocols=['streamlit'], max_size=None) as ws:
+        session = Session(ws)
+        timings.append(('open', await session.rerun()))
+        for _ in range(steps):
+            action = rng.choice(ACTIONS)
+            interact(session, action, rng)
+            timings.append((action, await session.rerun()))
+        errors.extend(session.errors)
+
+
+async def run_clients(url, sessions, steps, seed):
+    timings, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(url, steps, seed + i, timings, errors) for i in range(sessions)))
+    return timings, errors, time.perf_counter() - start
+
+
+def memory_mb(pid):
+    # Resident and peak resident set of a process, from /proc (Linux)
+    with open(f'/proc/{pid}/status') as f:
+        status = dict(line.split(':', 1) for line in f)
+    return int(status['VmRSS'].split()[0]) / 1024, int(status['VmHWM'].split()[0]) / 1024
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+
+def start_server(app, rows, port, timeout=120):
+    # SPA_PREVIEW=0: a first-paint preview would end the open before the data is in
+    env = {**os.environ, 'SPA_ROWS': str(rows), 'SPA_PREVIEW': '0'}
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', app, '--server.headless', 'true', '--server.port', str(port),
+         '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://localhost:{port}/_stcore/health') as response:
+                if response.read() == b'ok':
+                    return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise SystemExit(f'the server did not come up on port {port} within {timeout} s')
+
+
+def measure(app, rows, sessions, steps, seed):
+    port = free_port()
+    server = start_server(app, rows, port)
+    url = f'ws://localhost:{port}/_stcore/stream'
+    try:
+        # One warm-up session so the cold data load is not charged to the first N
+        _, _, cold = asyncio.run(run_clients(url, 1, 0, seed))
+        baseline_mb, _ = memory_mb(server.pid)
+        timings, errors, wall = asyncio.run(run_clients(url, sessions, steps, seed))
+        rss_mb, peak_mb = memory_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+    reruns = [seconds for action, seconds in timings if action != 'open']
+    result = {
+        'sessions': sessions,
+        'reruns': len(reruns),
+        'cold_start_s': cold,
+        'throughput_per_s': len(timings) / wall,
+        'rss_mb': rss_mb,
+        'peak_rss_mb': peak_mb,
+        'mb_per_session': (rss_mb - baseline_mb) / sessions,
+        'errors': errors,
+    }
+    for q, value in percentiles(reruns).items():
+        result[f'p{round(q * 100)}_ms'] = value * 1000
+    for action in ['open'] + ACTIONS:
+        result[f'{action}_p50_ms'] = percentiles([s for a, s in timings if a == action])[0.5] * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 4, 16, 32])
+    parser.add_argument('--steps', type=int, default=20, help='interactions per session')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--app', default=os.path.join(ROOT, 'app.py'))
+    parser.add_argument('--out', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'sessions':>8}{'reruns':>8}" + ''.join(f"{f'p{round(q * 100)} ms':>10}" for q in QUANTILES)
+          + f"{'reruns/s':>10}{'peak MB':>10}{'MB/session':>12}")
+    for sessions in args.sessions:
+        result = measure(args.app, args.rows, sessions, args.steps, args.seed)
+        results.append(result)
+        print(f"{sessions:>8}{result['reruns']:>8}"
+              + ''.join(f"{result[f'p{round(q * 100)}_ms']:>10.0f}" for q in QUANTILES)
+              + f"{result['throughput_per_s']:>10.1f}{result['peak_rss_mb']:>10.0f}{result['mb_per_session']:>12.1f}")
+        for message in result['errors'][:3]:
+            print(f"  error: {message}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'rows': args.rows, 'steps': args.steps, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
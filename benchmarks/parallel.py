@@ -0,0 +1,49 @@
+"""Scaling of the month-partitioned parallel cube build.
+
+    python benchmarks/parallel.py --rows 10000000 --workers 1 2 4 8 16 32 [--data PATH] [--threads]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cube import build_cube  # noqa: E402
+from data import generate_posts  # noqa: E402
+from dataset import read_posts  # noqa: E402
+from parallel import build_cube_parallel, build_cube_parallel_dataset  # noqa: E402
+
+
+def same(a, b):
+    return a.start == b.start and np.array_equal(a.posts, b.posts) and np.array_equal(a.keywords, b.keywords)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--data', help='Parquet dataset: workers read their own months')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--threads', action='store_true')
+    args = parser.parse_args()
+
+    df = read_posts(args.data) if args.data else generate_posts(args.rows, compact=True)
+    start = time.perf_counter()
+    serial = build_cube(df)
+    baseline = time.perf_counter() - start
+    print(f"{len(df):,} rows, {os.cpu_count()} CPUs; serial build_cube {baseline:.2f} s")
+    print(f"{'workers':>8}{'seconds':>10}{'speedup':>10}  identical")
+    for workers in args.workers:
+        start = time.perf_counter()
+        if args.data:
+            cube = build_cube_parallel_dataset(args.data, workers, threads=args.threads)
+        else:
+            cube = build_cube_parallel(df, workers, args.threads)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>8}{elapsed:>10.2f}{baseline / elapsed:>10.2f}  {same(cube, serial)}")
+
+
+if __name__ == '__main__':
+    main()
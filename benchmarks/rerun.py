@@ -0,0 +1,50 @@
+"""Headless rerun latency of the dashboard after a sidebar filter change.
+
+    python benchmarks/rerun.py --rows 10000000 --reruns 20 [--tab "📈 Timeline & Trends"]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--reruns', type=int, default=20)
+    parser.add_argument('--tab', default=None, help='tab label to keep selected')
+    parser.add_argument('--app', default=os.path.join(ROOT, 'app.py'))
+    args = parser.parse_args()
+
+    os.environ['SPA_ROWS'] = str(args.rows)
+    at = AppTest.from_file(args.app, default_timeout=3600)
+    start = time.perf_counter()
+    at.run()
+    print(f"cold start: {time.perf_counter() - start:.2f} s")
+
+    platforms = list(at.multiselect[0].value)
+    selections = [platforms, platforms[:-1]]
+    timings = []
+    for i in range(args.reruns):
+        if args.tab:
+            # AppTest does not echo tab state back like the browser does
+            at.session_state['active_tab'] = args.tab
+        at.multiselect[0].set_value(selections[i % 2])
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+    if at.exception:
+        raise SystemExit(at.exception[0].message)
+
+    timings.sort()
+    print(f"rerun over {args.reruns} filter changes: "
+          f"median {statistics.median(timings) * 1000:.0f} ms, "
+          f"p95 {timings[int(0.95 * (len(timings) - 1))] * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
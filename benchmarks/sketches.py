@@ -0,0 +1,74 @@
+"""Sketch accuracy and speed against exact answers over the same posts.
+
+    python benchmarks/sketches.py --rows 1000000
+
+Builds the sketches chunk by chunk, then for a few filter states compares
+the sketched p50/p90/p99 per platform with exact quantiles (as rank error)
+and the top phrases with exact counts, next to the documented bounds.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import FilterState  # noqa: E402
+from data import PLATFORMS, RISK_LEVELS, iter_posts  # noqa: E402
+from sketches import QUANTILES, SketchStats, build_sketches, phrase_counts  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-rows', type=int, default=250_000)
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    chunks = list(iter_posts(args.rows, chunk_size=args.chunk_rows, compact=True, text=True))
+    start = time.perf_counter()
+    store = build_sketches(chunks)
+    built = time.perf_counter() - start
+    df = pd.concat(chunks, ignore_index=True)
+    print(f"build {args.rows / built:,.0f} posts/s, {store.nbytes / 2**20:.1f} MB of sketches")
+
+    first, last = df['date'].min(), df['date'].max()
+    cases = [
+        ('everything', FilterState.from_sidebar(PLATFORMS, RISK_LEVELS, (first, last))),
+        ('last 30 days', FilterState.from_sidebar(PLATFORMS, RISK_LEVELS, (last - pd.Timedelta(days=29), last))),
+        ('Reddit high risk', FilterState.from_sidebar(['Reddit'], ['High', 'Critical'], (first, last))),
+    ]
+    for name, filters in cases:
+        selected = df[df['platform'].isin(filters.platforms) & df['risk_level'].isin(filters.risk_levels)
+                      & df['date'].between(filters.date_from, filters.date_to)]
+        stats = SketchStats(store, filters, args.top)
+
+        start = time.perf_counter()
+        percentiles = stats.severity_percentiles
+        top = stats.top_phrases
+        query_ms = (time.perf_counter() - start) * 1000
+
+        # Rank error: how far the sketched value's rank is from the requested quantile
+        errors = []
+        for _, row in percentiles.iterrows():
+            severity = np.sort(selected.loc[selected['platform'] == row['Platform'], 'severity_score'].to_numpy(np.float64))
+            for q in QUANTILES:
+                rank = np.searchsorted(severity, row[f'p{round(q * 100)}'], side='right') / len(severity)
+                errors.append(abs(rank - q))
+
+        _, phrase, count = phrase_counts(selected['message'].tolist(), np.zeros(len(selected), dtype=np.int64))
+        exact = pd.Series(count, index=phrase)
+        overcount = (top.set_index('Phrase')['Estimate'] - exact.reindex(top['Phrase']).to_numpy()).max()
+        # Exact top phrases that beat the runner-up by more than the bound must all be listed
+        leaders = exact.nlargest(args.top + 1)
+        clear = leaders.index[:args.top][leaders.iloc[:args.top] > leaders.iloc[-1] + stats.phrase_error]
+        listed = len(set(clear) & set(top['Phrase']))
+        print(f"{name:<18}query {query_ms:6.1f} ms | rank error max {max(errors):.3%} (bound {stats.rank_error:.2%}) | "
+              f"phrase overcount max {overcount:,} (bound {stats.phrase_error:,.0f}) | clear leaders listed {listed}/{len(clear)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Fresh-process startup: module import time and time to first paint.
+
+    python benchmarks/startup.py --rows 2000000
+
+Each case runs the app once in a new Python process (AppTest, so no browser)
+against its own disk cache: empty (cold), holding the cube (warm), and
+holding only the first-paint summary (the cube of the current data still
+to be built, e.g. the first process after new data lands).
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The dashboard's own modules, on top of Streamlit and pandas
+IMPORTS = """
+import time
+import streamlit, pandas  # noqa
+start = time.perf_counter()
+import alerts, analytics, cube, data, figures, profiling, scoring, sketches, startup, stream  # noqa
+print(time.perf_counter() - start)
+"""
+
+PAINT = """
+import time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file(%r, default_timeout=900)
+at.run()
+print(time.perf_counter() - start)
+"""
+
+
+def run(code, env):
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.split()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    env = {**os.environ, 'SPA_ROWS': str(args.rows), 'SPA_CACHE_DIR': os.path.join(root, 'cache')}
+    try:
+        imports = min(run(IMPORTS, env) for _ in range(args.repeat))
+        print(f"{'import':<14}{imports * 1000:8.0f} ms")
+
+        paint = PAINT % os.path.join(ROOT, 'app.py')
+        cold = run(paint, env)
+        warm = min(run(paint, env) for _ in range(args.repeat))
+        # Keep only the summary; every other cache entry is the posts or the cube
+        for entry in os.listdir(env['SPA_CACHE_DIR']):
+            path = os.path.join(env['SPA_CACHE_DIR'], entry)
+            if not os.path.exists(os.path.join(path, 'summary.json')):
+                shutil.move(path, os.path.join(root, entry))
+        summary_only = run(paint, env)
+        for name, seconds in [('cold', cold), ('warm', warm), ('summary only', summary_only)]:
+            print(f"{name:<14}{seconds:8.2f} s to first paint")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""Headless benchmark of every stage behind a dashboard rerun, with run comparison.
+
+    python benchmarks/suite.py run --rows 10000 1000000 10000000 50000000 --out base.json
+    python benchmarks/suite.py run --out new.json
+    python benchmarks/suite.py compare base.json new.json --threshold 0.10
+
+Each size runs in its own process. Posts are generated in chunks and folded
+into the cube as load_cube does out-of-core, so 50M rows fit in memory. The
+sidebar filter (the cube window that replaced filtered_df) and each tab's
+tables are timed best-of-N. Every stage records wall time, taken without
+tracing, and its tracemalloc peak from a separate traced run of that stage
+alone; every size records the process peak RSS. compare
+flags any stage slower than the threshold and exits 1 when it finds one.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import FilterState, peak_rss_mb, summarize  # noqa: E402
+from cube import CubeBuilder  # noqa: E402
+from data import PLATFORMS, RISK_LEVELS, iter_posts  # noqa: E402
+
+SIZES = [10_000, 1_000_000, 10_000_000, 50_000_000]
+CHUNK_ROWS = 1_000_000
+
+# Tab tables, each derived from a fresh DashboardStats so no cached_property is shared
+TABLES = ['risk_counts', 'platform_stats', 'hourly_pivot', 'keyword_stats', 'monthly_stats', 'daily_severity']
+
+# Differences below this are timer noise, whatever the ratio
+MIN_SECONDS = 0.0005
+
+
+def traced(fn):
+    """(seconds, tracemalloc peak MB) of one call."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2**20
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def sidebar_filters(cube):
+    # A typical narrowed selection: three platforms, Medium and up, the last 90 days
+    return FilterState.from_sidebar(
+        PLATFORMS[:3], RISK_LEVELS[1:], (cube.last_date - pd.Timedelta(days=89), cube.last_date)
+    )
+
+
+def chunks_of(n_rows, text):
+    return iter_posts(n_rows, chunk_size=min(n_rows, CHUNK_ROWS), compact=True, text=text)
+
+
+def timed_build(n_rows, text):
+    """(load_data seconds, build_cube seconds, cube) of one untraced chunked pass."""
+    builder = CubeBuilder()
+    generate = aggregate = 0.0
+    chunks = chunks_of(n_rows, text)
+    while True:
+        start = time.perf_counter()
+        chunk = next(chunks, None)
+        generate += time.perf_counter() - start
+        if chunk is None:
+            break
+        start = time.perf_counter()
+        builder.add(chunk)
+        aggregate += time.perf_counter() - start
+        del chunk
+    start = time.perf_counter()
+    cube = builder.build()
+    aggregate += time.perf_counter() - start
+    return generate, aggregate, cube
+
+
+def load_peak_mb(n_rows, text):
+    # Generation alone: the chunk and its temporaries
+    tracemalloc.start()
+    for chunk in chunks_of(n_rows, text):
+        del chunk
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def build_peak_mb(n_rows, text):
+    # The builder's tables plus one chunk being folded in; the peak is reset after
+    # each chunk is generated so generation's temporaries are not counted
+    builder = CubeBuilder()
+    tracemalloc.start()
+    peak = 0
+    for chunk in chunks_of(n_rows, text):
+        tracemalloc.reset_peak()
+        builder.add(chunk)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        del chunk
+    tracemalloc.reset_peak()
+    builder.build()
+    peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def measure(n_rows, repeat, text):
+    results = []
+
+    # load_data and the cube build: timed over one untraced pass, then each traced in its own pass
+    generate, aggregate, cube = timed_build(n_rows, text)
+    results.append({'stage': 'load_data', 'seconds': generate, 'peak_mb': load_peak_mb(n_rows, text)})
+    results.append({'stage': 'build_cube', 'seconds': aggregate, 'peak_mb': build_peak_mb(n_rows, text)})
+
+    filters = sidebar_filters(cube)
+    seconds = best_of(lambda: summarize(cube, filters), repeat)
+    results.append({'stage': 'filter', 'seconds': seconds, 'peak_mb': traced(lambda: summarize(cube, filters))[1]})
+
+    for table in TABLES:
+        def derive():
+            return getattr(summarize(cube, filters), table)
+        seconds = best_of(derive, repeat)
+        results.append({'stage': table, 'seconds': seconds, 'peak_mb': traced(derive)[1]})
+
+    return {'rows': n_rows, 'peak_rss_mb': peak_rss_mb(), 'stages': results}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    sizes = []
+    for n_rows in args.rows:
+        # A fresh process per size keeps peak RSS and allocator state independent
+        command = [sys.executable, os.path.abspath(__file__), 'measure', str(n_rows), '--repeat', str(args.repeat)]
+        if args.text:
+            command.append('--text')
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        size = json.loads(output)
+        sizes.append(size)
+        print(f"\n{n_rows:,} rows · peak RSS {size['peak_rss_mb']:.0f} MB")
+        print(f"{'stage':<16}{'seconds':>12}{'peak MB':>10}")
+        for stage in size['stages']:
+            print(f"{stage['stage']:<16}{stage['seconds']:>12.4f}{stage['peak_mb']:>10.1f}")
+
+    results = {
+        'meta': {
+            'created': pd.Timestamp.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+            'text': args.text,
+        },
+        'sizes': sizes,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nwrote {args.out}")
+
+
+def flatten(results):
+    return {
+        (size['rows'], stage['stage']): stage
+        for size in results['sizes']
+        for stage in size['stages']
+    }
+
+
+def compare(args):
+    with open(args.base) as f:
+        base = flatten(json.load(f))
+    with open(args.new) as f:
+        new = flatten(json.load(f))
+
+    regressions = 0
+    print(f"{'rows':>12}  {'stage':<16}{'base s':>10}{'new s':>10}{'change':>9}{'base MB':>9}{'new MB':>9}")
+    for key in [key for key in new if key in base]:
+        old, cur = base[key], new[key]
+        change = cur['seconds'] / old['seconds'] - 1 if old['seconds'] else 0.0
+        slower = change > args.threshold and cur['seconds'] - old['seconds'] > MIN_SECONDS
+        heavier = cur['peak_mb'] > old['peak_mb'] * (1 + args.threshold) + 1
+        flag = '  REGRESSION' if slower or heavier else ''
+        regressions += bool(flag)
+        print(f"{key[0]:>12,}  {key[1]:<16}{old['seconds']:>10.4f}{cur['seconds']:>10.4f}{change:>+9.0%}"
+              f"{old['peak_mb']:>9.1f}{cur['peak_mb']:>9.1f}{flag}")
+    for key in [key for key in {**base, **new} if (key in base) != (key in new)]:
+        print(f"{key[0]:>12,}  {key[1]:<16}only in {'base' if key in base else 'new'}")
+
+    print(f"\n{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='benchmark every size and write a results file')
+    run_parser.add_argument('--rows', type=int, nargs='+', default=SIZES)
+    run_parser.add_argument('--repeat', type=int, default=5, help='best-of repeats for the query stages')
+    run_parser.add_argument('--text', action='store_true', help='generate message text and match keywords')
+    run_parser.add_argument('--out', default='benchmark.json')
+
+    measure_parser = commands.add_parser('measure', help=argparse.SUPPRESS)
+    measure_parser.add_argument('rows', type=int)
+    measure_parser.add_argument('--repeat', type=int, default=5)
+    measure_parser.add_argument('--text', action='store_true')
+
+    compare_parser = commands.add_parser('compare', help='compare two results files and flag regressions')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown or memory growth')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    elif args.command == 'measure':
+        json.dump(measure(args.rows, args.repeat, args.text), sys.stdout)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Disk cache for the posts frame and the cube, shared by every process on a host.
+
+Entries live in <root>/<key>/ where the key hashes the data version and the
+generator parameters. Frames are stored as uncompressed Arrow IPC files and
+cubes as .npy arrays, both memory-mapped on load, so replicas and worker
+processes share the same read-only pages instead of each regenerating and
+holding a private copy. Frame columns come back as NumPy views on the
+mapping (booleans are stored as bytes so they can), except columns with
+nulls or several chunks, which are copied. Small JSON documents (the first-paint summary) are
+replaced in place. Entries are written to a temporary directory and
+renamed into place, and the least recently used ones are evicted once the
+cache grows past its size budget.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from cube import Cube
+
+# Bump when the layout of cached frames or cubes, or the synthetic posts they hold, change
+CACHE_VERSION = 2
+
+
+def cache_key(**params):
+    blob = json.dumps({'version': CACHE_VERSION, **params}, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+def dataset_version(path):
+    # Fingerprint of a Parquet dataset directory: file names, sizes and mtimes
+    digest = hashlib.sha1()
+    for directory, _, files in sorted(os.walk(path)):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(directory, name))
+            digest.update(f"{os.path.relpath(os.path.join(directory, name), path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def mapped_values(column, boolean=False):
+    # NumPy views on the mapped file for single-chunk columns without nulls, else a copy
+    if column.num_chunks == 1 and column.null_count == 0:
+        array = column.chunk(0)
+        if pa.types.is_dictionary(array.type):
+            dtype = pd.CategoricalDtype(array.dictionary.to_pylist(), ordered=array.type.ordered)
+            return pd.Categorical.from_codes(array.indices.to_numpy(), dtype=dtype, validate=False)
+        if pa.types.is_integer(array.type) or pa.types.is_floating(array.type) or pa.types.is_timestamp(array.type):
+            values = array.to_numpy()
+            return values.view(bool) if boolean else values
+    return column.to_pandas()
+
+
+class DiskCache:
+    def __init__(self, root, max_mb=1024):
+        self.root = root
+        self.max_bytes = max_mb * 2**20
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key, name):
+        return os.path.join(self.root, key, name)
+
+    def _hit(self, key, name):
+        path = self._path(key, name)
+        if not os.path.exists(path):
+            return None
+        # Entry mtime is the LRU clock
+        os.utime(os.path.join(self.root, key))
+        return path
+
+    def _store(self, key, name, write):
+        staging = tempfile.mkdtemp(dir=self.root, prefix='.tmp-')
+        try:
+            write(os.path.join(staging, name))
+            os.makedirs(os.path.join(self.root, key), exist_ok=True)
+            target = self._path(key, name)
+            if os.path.exists(target):
+                # Another process stored it first
+                return
+            os.rename(os.path.join(staging, name), target)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+
+    def get_frame(self, key):
+        path = self._hit(key, 'posts.arrow')
+        if path is None:
+            return None
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        bools = {c['name'] for c in (table.schema.pandas_metadata or {}).get('columns', []) if c['numpy_type'] == 'bool'}
+        return pd.DataFrame({name: mapped_values(table.column(name), name in bools) for name in table.column_names},
+                            copy=False)
+
+    def put_frame(self, key, df):
+        def write(path):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            for i, field in enumerate(table.schema):
+                if pa.types.is_boolean(field.type):
+                    # Bytes rather than Arrow's bits, so the column maps straight back into NumPy
+                    table = table.set_column(i, field.name, pc.cast(table.column(i), pa.uint8()))
+            with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        self._store(key, 'posts.arrow', write)
+
+    def get_cube(self, key):
+        path = self._hit(key, 'cube')
+        return Cube.load(path) if path else None
+
+    def put_cube(self, key, cube):
+        self._store(key, 'cube', cube.save)
+
+    def get_json(self, key, name):
+        path = self._hit(key, name)
+        if path is None:
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def put_json(self, key, name, value):
+        # Small documents are replaced in place, newest writer wins
+        os.makedirs(os.path.join(self.root, key), exist_ok=True)
+        staging = f'{self._path(key, name)}.{os.getpid()}.tmp'
+        with open(staging, 'w') as f:
+            json.dump(value, f)
+        os.replace(staging, self._path(key, name))
+
+    def evict(self):
+        entries = [os.path.join(self.root, e) for e in os.listdir(self.root) if not e.startswith('.')]
+        entries = sorted((os.path.getmtime(e), directory_size(e), e) for e in entries)
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
@@ -0,0 +1,100 @@
+import os
+
+
+def _int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+# Generate message text and derive keywords by matching it (SPA_TEXT=1; off: keywords are drawn directly,
+# about 20x faster). The text itself is only streamed to the phrase sketches, never kept in memory
+DATA_TEXT = bool(_int('SPA_TEXT', 0))
+
+# Local Parquet dataset written by dataset.py; when unset the synthetic posts are generated
+DATA_PATH = os.environ.get('SPA_DATA_PATH')
+
+# Synthetic dataset size; leave SPA_ROWS unset for the original ~4.5k post demo
+DATA_ROWS = _int('SPA_ROWS', None)
+DATA_DAYS = _int('SPA_DAYS', 180)
+DATA_SEED = _int('SPA_SEED', 42)
+
+# Out-of-core mode: build the cube chunk by chunk with about this much working memory
+DATA_MEMORY_MB = _int('SPA_MEMORY_MB', None)
+
+# Worker processes for building the cube, one month partition per task
+DATA_WORKERS = _int('SPA_WORKERS', 1)
+
+# Disk cache for the posts frame and cube shared by all processes (SPA_CACHE_DIR= disables it)
+CACHE_DIR = os.environ.get('SPA_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'suicide-prevention-app'))
+CACHE_MB = _int('SPA_CACHE_MB', 2048)
+
+# Startup: unless the cube is ready within SPA_PREVIEW_WAIT seconds, a fresh process
+# paints the header, sidebar and metric cards from the last stored summary while
+# the cube loads in the background (SPA_PREVIEW=0 waits for the cube instead)
+PREVIEW = bool(_int('SPA_PREVIEW', 1))
+PREVIEW_WAIT = _float('SPA_PREVIEW_WAIT', 0.1)
+
+# Built Plotly figures kept in memory, one per (figure, filter state)
+FIGURE_CACHE_SIZE = _int('SPA_FIGURE_CACHE', 256)
+
+# Most points each chart sends to the browser (SPA_POINTS_DAILY_SEVERITY etc.)
+POINT_BUDGETS = {
+    name: _int(f'SPA_POINTS_{name.upper()}', default)
+    for name, default in [('daily_severity', 2000), ('timeline', 1000), ('keyword_matrix', 500)]
+}
+
+# Charts with more points than this are drawn with WebGL traces
+WEBGL_POINTS = _int('SPA_WEBGL_POINTS', 1000)
+
+# JSON lines file of newly scored posts to tail into the dashboard (see stream.py)
+STREAM_PATH = os.environ.get('SPA_STREAM')
+
+# Streamed posts are scored and folded in micro-batches of this many rows, or
+# sooner once the oldest waiting post has waited SPA_STREAM_BATCH_SECONDS
+STREAM_BATCH_ROWS = _int('SPA_STREAM_BATCH_ROWS', 100_000)
+STREAM_BATCH_SECONDS = _float('SPA_STREAM_BATCH_SECONDS', 0.1)
+
+# JSON file overriding the risk scoring thresholds (fields of scoring.ScoringRules)
+SCORING_RULES = os.environ.get('SPA_SCORING_RULES')
+
+# Seconds between checks for newly streamed posts while a dashboard is open
+STREAM_REFRESH = _int('SPA_STREAM_REFRESH', 2)
+
+# Alerts for streamed posts: Critical, or severity above the threshold, at most
+# SPA_ALERT_RATE per second per platform after a burst of SPA_ALERT_BURST
+ALERT_SEVERITY = _float('SPA_ALERT_SEVERITY', 9.0)
+ALERT_RATE = _float('SPA_ALERT_RATE', 5.0)
+ALERT_BURST = _int('SPA_ALERT_BURST', 20)
+
+# Anomaly detection (see anomalies.py): a day is flagged when it is SPA_ANOMALY_Z
+# deviations from its series' EWMA (half-life in days), once the series has
+# SPA_ANOMALY_WARMUP days; rates need SPA_ANOMALY_MIN_POSTS posts that day
+ANOMALY_Z = _float('SPA_ANOMALY_Z', 3.5)
+ANOMALY_HALFLIFE = _float('SPA_ANOMALY_HALFLIFE', 14)
+ANOMALY_WARMUP = _int('SPA_ANOMALY_WARMUP', 14)
+ANOMALY_MIN_POSTS = _int('SPA_ANOMALY_MIN_POSTS', 10)
+
+# Approximate analytics (see sketches.py): severity percentiles and top phrases
+# answered from per day/platform/risk level sketches; k, width and depth set the
+# error bounds, heavy the phrases kept per cell
+APPROX = bool(_int('SPA_APPROX', 0))
+SKETCH_K = _int('SPA_SKETCH_K', 200)
+SKETCH_WIDTH = _int('SPA_SKETCH_WIDTH', 1024)
+SKETCH_DEPTH = _int('SPA_SKETCH_DEPTH', 4)
+SKETCH_HEAVY = _int('SPA_SKETCH_HEAVY', 64)
+TOP_PHRASES = _int('SPA_TOP_PHRASES', 20)
+
+# Time every phase of each rerun and show it in a sidebar debug panel
+PROFILE = bool(_int('SPA_PROFILE', 0))
+
+# Also append each rerun's timings to a JSON lines file / rewrite a Prometheus text file
+PROFILE_JSONL = os.environ.get('SPA_PROFILE_JSONL')
+PROFILE_PROMETHEUS = os.environ.get('SPA_PROFILE_PROMETHEUS')
+
+# Categorical / narrow-dtype column layout (SPA_COMPACT=0 keeps strings and 64-bit columns)
+DATA_COMPACT = bool(_int('SPA_COMPACT', 1))
@@ -0,0 +1,289 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from data import KEYWORDS, PLATFORMS, RISK_LEVELS, SENTIMENTS
+
+# Measures stored on the last axis of every cube table
+COUNT, SEVERITY, INTERVENTIONS = range(3)
+MEASURES = 3
+HOURS = 24
+
+# Timeline granularities; a bucket's integer key is its first instant in this
+# datetime64 unit since 1970, so keys sort in time and convert without strings
+KEY_UNITS = {'hour': 'h', 'day': 'D', 'week': 'D', 'month': 'M', 'quarter': 'M'}
+GRANULARITIES = list(KEY_UNITS)
+
+# Cell axes after the day axis of each table
+POSTS_AXES = (len(PLATFORMS), len(RISK_LEVELS), HOURS, len(SENTIMENTS))
+KEYWORDS_AXES = (len(PLATFORMS), len(RISK_LEVELS), len(KEYWORDS))
+
+
+def category_codes(series, categories):
+    # Integer codes for a categorical or plain string column
+    if isinstance(series.dtype, pd.CategoricalDtype) and list(series.cat.categories) == list(categories):
+        return series.cat.codes.to_numpy()
+    return pd.Categorical(series, categories=categories).codes
+
+
+def accumulate(shape, index, severity, intervention):
+    # One bincount pass per measure over the flattened cell index
+    flat = np.ravel_multi_index(index, shape)
+    size = int(np.prod(shape))
+    table = np.empty(shape + (MEASURES,))
+    table[..., COUNT] = np.bincount(flat, minlength=size).reshape(shape)
+    table[..., SEVERITY] = np.bincount(flat, weights=severity, minlength=size).reshape(shape)
+    table[..., INTERVENTIONS] = np.bincount(flat, weights=intervention, minlength=size).reshape(shape)
+    return table
+
+
+def prefix_sums(table):
+    # cum[d] holds the totals of days [0, d), so any range is cum[b] - cum[a]
+    cum = np.zeros((table.shape[0] + 1,) + table.shape[1:])
+    np.cumsum(table, axis=0, out=cum[1:])
+    return cum
+
+
+def day_keys(start, n_days):
+    """Bucket key of every day from start, per granularity coarser than an hour."""
+    day = np.datetime64(start, 'D').astype(np.int64) + np.arange(n_days)
+    month = day.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    return {
+        'day': day,
+        # ISO weeks start on Monday; 1970-01-01 was a Thursday
+        'week': day - (day + 3) % 7,
+        'month': month,
+        'quarter': month - month % 3,
+    }
+
+
+def selection_mask(labels, selected):
+    if selected is None:
+        return np.ones(len(labels), dtype=bool)
+    return np.isin(labels, list(selected))
+
+
+def ratio(numerator, denominator):
+    # Element-wise mean from sums and counts, 0 where there is no data
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    return np.divide(numerator, denominator, out=np.zeros(np.broadcast(numerator, denominator).shape),
+                     where=denominator > 0)
+
+
+class CubeWindow:
+    """Cube totals for one sidebar filter state; unselected platforms/risk levels are zero."""
+
+    def __init__(self, posts, keywords, daily, hourly, time_keys, dates, platforms, risk_levels):
+        self.posts = posts          # (platform, risk, hour, sentiment, measure)
+        self.keywords = keywords    # (platform, risk, keyword, measure)
+        self.daily = daily          # (day, platform, risk, measure)
+        self.hourly = hourly        # (day, platform, risk, hour, measure), unmasked view of the cube
+        self.time_keys = time_keys  # granularity -> bucket key per day
+        self.dates = dates
+        self.platforms = platforms  # boolean masks of the selection
+        self.risk_levels = risk_levels
+
+    def rollup(self, granularity):
+        """(bucket keys, (bucket, measure) sums) of the selection at one granularity."""
+        if granularity == 'hour':
+            keep = (self.platforms[:, None] & self.risk_levels[None, :]).astype(float)
+            hourly = np.einsum('dprhm,pr->dhm', self.hourly, keep)
+            keys = self.time_keys['day'][:, None] * HOURS + np.arange(HOURS)
+            return keys.ravel(), hourly.reshape(-1, MEASURES)
+        keys = self.time_keys[granularity]
+        if not len(keys):
+            return keys, np.zeros((0, MEASURES))
+        # Days are consecutive, so each bucket is a run of equal keys
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        return keys[starts], np.add.reduceat(self.daily.sum(axis=(1, 2)), starts, axis=0)
+
+
+class Cube:
+    """Counts, severity sums and interventions per day and post attributes.
+
+    posts:    (day, platform, risk_level, hour, sentiment, measure)
+    keywords: (day, platform, risk_level, keyword, measure)
+
+    Both tables keep prefix sums over the day axis, so a date range costs two
+    slices and a subtraction whatever the number of rows behind the cube.
+    The hour and week/month/quarter keys of the timeline are worked out once
+    here, so a rerun only sums runs of days (or reads hours) per bucket.
+    """
+
+    # Arrays written by save() and memory-mapped back by load()
+    ARRAYS = ['posts', 'keywords', 'daily', '_posts_cum', '_keywords_cum']
+
+    def __init__(self, start, posts, keywords):
+        self.start = np.datetime64(start, 'D')
+        self.posts = posts
+        self.keywords = keywords
+        self.daily = posts.sum(axis=(3, 4))
+        self._posts_cum = prefix_sums(posts)
+        self._keywords_cum = prefix_sums(keywords)
+        self._add_time_rollups()
+
+    def _add_time_rollups(self):
+        # Not saved: cheap to derive from posts whenever a cube is built or loaded
+        self.hourly = self.posts.sum(axis=4)
+        self.time_keys = day_keys(self.start, self.n_days)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, name.lstrip('_') + '.npy'), getattr(self, name))
+        with open(os.path.join(directory, 'cube.json'), 'w') as f:
+            json.dump({'start': str(self.start)}, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Open a saved cube; with mmap_mode='r' processes share its pages read-only."""
+        cube = cls.__new__(cls)
+        with open(os.path.join(directory, 'cube.json')) as f:
+            cube.start = np.datetime64(json.load(f)['start'], 'D')
+        for name in cls.ARRAYS:
+            setattr(cube, name, np.load(os.path.join(directory, name.lstrip('_') + '.npy'), mmap_mode=mmap_mode))
+        cube._add_time_rollups()
+        return cube
+
+    @property
+    def n_days(self):
+        return self.posts.shape[0]
+
+    @property
+    def dates(self):
+        return pd.date_range(pd.Timestamp(self.start), periods=self.n_days, freq='D')
+
+    @property
+    def first_date(self):
+        return pd.Timestamp(self.start)
+
+    @property
+    def last_date(self):
+        return pd.Timestamp(self.start + max(self.n_days - 1, 0))
+
+    @property
+    def platforms(self):
+        # Platforms that have at least one post, in the order of PLATFORMS
+        present = self.daily[..., COUNT].sum(axis=(0, 2)) > 0
+        return [p for p, keep in zip(PLATFORMS, present) if keep]
+
+    def totals(self):
+        # (measure,) over the whole cube
+        return self.daily.sum(axis=(0, 1, 2))
+
+    def day_range(self, date_from, date_to):
+        a = int((np.datetime64(pd.Timestamp(date_from), 'D') - self.start).astype(int))
+        b = int((np.datetime64(pd.Timestamp(date_to), 'D') - self.start).astype(int)) + 1
+        a = min(max(a, 0), self.n_days)
+        b = min(max(b, a), self.n_days)
+        return a, b
+
+    def window(self, date_from, date_to, platforms=None, risk_levels=None):
+        a, b = self.day_range(date_from, date_to)
+        p = selection_mask(PLATFORMS, platforms)
+        r = selection_mask(RISK_LEVELS, risk_levels)
+        keep = (p[:, None] & r[None, :]).astype(float)
+
+        posts = (self._posts_cum[b] - self._posts_cum[a]) * keep[:, :, None, None, None]
+        keywords = (self._keywords_cum[b] - self._keywords_cum[a]) * keep[:, :, None, None]
+        daily = self.daily[a:b] * keep[None, :, :, None]
+        time_keys = {granularity: keys[a:b] for granularity, keys in self.time_keys.items()}
+        return CubeWindow(posts, keywords, daily, self.hourly[a:b], time_keys, self.dates[a:b], p, r)
+
+
+def cube_tables(df):
+    """Scan a posts frame once; returns (start day, posts table, keywords table)."""
+    days = df['date'].to_numpy().astype('datetime64[D]')
+    start = days.min() if len(days) else np.datetime64('today', 'D')
+    n_days = int((days.max() - start).astype(int)) + 1 if len(days) else 0
+    day = (days - start).astype(np.int64)
+
+    platform = category_codes(df['platform'], PLATFORMS)
+    risk = category_codes(df['risk_level'], RISK_LEVELS)
+    sentiment = category_codes(df['sentiment'], SENTIMENTS)
+    hour = df['hour'].to_numpy()
+    severity = df['severity_score'].to_numpy(dtype=np.float64)
+    intervention = df['intervention'].to_numpy(dtype=np.float64)
+    posts = accumulate((n_days,) + POSTS_AXES, (day, platform, risk, hour, sentiment), severity, intervention)
+
+    if 'keyword_mask' in df.columns:
+        # Posts with text count once for every keyword matched in them
+        bits = np.arange(len(KEYWORDS), dtype=np.uint64)
+        mask = df['keyword_mask'].to_numpy().astype(np.uint64)
+        rows, keyword = np.nonzero((mask[:, None] >> bits) & np.uint64(1))
+    else:
+        keyword = category_codes(df['keyword'], KEYWORDS)
+        rows = np.flatnonzero(keyword >= 0)
+        keyword = keyword[rows]
+    keywords = accumulate((n_days,) + KEYWORDS_AXES, (day[rows], platform[rows], risk[rows], keyword),
+                          severity[rows], intervention[rows])
+    return start, posts, keywords
+
+
+class CubeBuilder:
+    """Sums partial cube tables, e.g. one per chunk of a dataset larger than RAM.
+
+    Tables are aligned on their start day, so chunks may arrive in any order
+    and cover any date range. Memory is bounded by the cube, not the rows.
+    """
+
+    def __init__(self):
+        self.start = None
+        self.posts = None
+        self.keywords = None
+        self.rows = 0
+
+    def add(self, df):
+        self.add_tables(*cube_tables(df))
+        self.rows += len(df)
+        return self
+
+    def add_tables(self, start, posts, keywords):
+        if not len(posts):
+            return self
+        start = np.datetime64(start, 'D')
+        if self.posts is None:
+            self.start, self.posts, self.keywords = start, posts.copy(), keywords.copy()
+            return self
+
+        end = max(self.start + len(self.posts), start + len(posts))
+        if start < self.start or end > self.start + len(self.posts):
+            new_start = min(self.start, start)
+            self.posts = self._extend(self.posts, self.start, new_start, end)
+            self.keywords = self._extend(self.keywords, self.start, new_start, end)
+            self.start = new_start
+
+        offset = int((start - self.start).astype(int))
+        self.posts[offset:offset + len(posts)] += posts
+        self.keywords[offset:offset + len(keywords)] += keywords
+        return self
+
+    @staticmethod
+    def _extend(table, start, new_start, end):
+        grown = np.zeros((int((end - new_start).astype(int)),) + table.shape[1:])
+        offset = int((start - new_start).astype(int))
+        grown[offset:offset + len(table)] = table
+        return grown
+
+    def build(self):
+        if self.posts is None:
+            return Cube(np.datetime64('today', 'D'),
+                        np.zeros((0,) + POSTS_AXES + (MEASURES,)),
+                        np.zeros((0,) + KEYWORDS_AXES + (MEASURES,)))
+        return Cube(self.start, self.posts, self.keywords)
+
+
+def build_cube(df):
+    """Scan the posts frame once and materialise the cube."""
+    return Cube(*cube_tables(df))
+
+
+def build_cube_from_chunks(chunks):
+    """Out-of-core build: aggregate each chunk and merge the partial tables."""
+    builder = CubeBuilder()
+    for chunk in chunks:
+        builder.add(chunk)
+    return builder.build()
@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from functools import lru_cache
+
+from keywords import KeywordMatcher, mask_dtype
+from scoring import DEFAULT_RULES, intervention_p, sentiment_codes, severity_scores
+
+PLATFORMS = ['Twitter', 'Reddit', 'Instagram', 'Facebook']
+PLATFORM_P = [0.3, 0.25, 0.25, 0.2]
+
+RISK_LEVELS = ['Low', 'Medium', 'High', 'Critical']
+RISK_P = [0.45, 0.30, 0.15, 0.10]
+
+# Severity band (low, high) per risk level, same order as RISK_LEVELS (see scoring.py)
+SEVERITY_BANDS = np.array(DEFAULT_RULES.severity_bands)
+LATE_NIGHT_HOURS = DEFAULT_RULES.late_night_hours
+LATE_NIGHT_MULTIPLIER = DEFAULT_RULES.late_night_multiplier
+
+SENTIMENTS = ['Negative', 'Neutral', 'Positive']
+
+KEYWORDS = ['hopeless', 'alone', 'suicide', 'depressed', 'worthless', 'end it',
+            'give up', 'no point', 'can\'t go on', 'better off dead']
+
+# Compact layout: categoricals on integer codes and narrow numeric columns
+CATEGORY_DTYPES = {
+    'platform': pd.CategoricalDtype(PLATFORMS),
+    'risk_level': pd.CategoricalDtype(RISK_LEVELS, ordered=True),
+    'sentiment': pd.CategoricalDtype(SENTIMENTS),
+    'keyword': pd.CategoricalDtype(KEYWORDS),
+}
+COMPACT_DTYPES = {
+    **CATEGORY_DTYPES,
+    'severity_score': np.float32,
+    'hour': np.int8,
+    'intervention': bool,
+}
+
+COLUMNS = ['date', 'platform', 'risk_level', 'severity_score', 'hour',
+           'sentiment', 'intervention', 'keyword']
+
+# Present when posts carry text: the raw message and a bit per matched keyword
+TEXT_COLUMNS = ['message', 'keyword_mask']
+KEYWORD_MASK_DTYPE = mask_dtype(len(KEYWORDS))
+
+# Synthetic message text around the drawn keyword; some posts mention a second one
+MESSAGE_PREFIXES = ['', 'I feel ', 'honestly ', 'Everything is just ', 'why do I always feel ',
+                    'i just want to say ', 'Tonight: ', 'not sure anyone reads this but ']
+MESSAGE_SUFFIXES = ['', '.', ' again', ' and nobody notices', '... might as well spend it all',
+                    ' #mentalhealth', '!!', ' tbh']
+SECOND_KEYWORD_P = 0.15
+
+# Rows drawn per seeded block; chunks of any size are cut from the same blocks
+BLOCK_ROWS = 16_384
+
+
+def day_counts(n_rows=None, n_days=180, seed=42):
+    # Posts per day: 15-34 per day like the original demo, or n_rows spread over the days
+    rng = np.random.default_rng([seed, 0])
+    if n_rows is None:
+        return rng.integers(15, 35, size=n_days)
+    return rng.multinomial(n_rows, np.full(n_days, 1 / n_days))
+
+
+def draw_columns(rng, n, rules=DEFAULT_RULES):
+    # Draw every column for n posts as whole arrays, returned as integer codes
+    platform = rng.choice(len(PLATFORMS), size=n, p=PLATFORM_P).astype(np.int8)
+    risk = rng.choice(len(RISK_LEVELS), size=n, p=RISK_P).astype(np.int8)
+
+    # Severity within the risk level's band, higher late at night
+    position = rng.random(n)
+    hour = rng.integers(0, 24, size=n).astype(np.int8)
+    severity = severity_scores(risk, position, hour, rules)
+
+    sentiment = sentiment_codes(severity, rng.random(n), rules)
+    intervention = rng.random(n) < intervention_p(severity, rules)
+
+    keyword = rng.integers(0, len(KEYWORDS), size=n).astype(np.int8)
+
+    return {
+        'platform': platform,
+        'risk_level': risk,
+        'severity_score': severity,
+        'hour': hour,
+        'sentiment': sentiment,
+        'intervention': intervention,
+        'keyword': keyword,
+    }
+
+
+def keyword_variants(keyword):
+    # Surface forms the matcher has to normalise: case and typographic apostrophes
+    return [keyword, keyword.upper(), keyword.capitalize(), keyword.replace("'", '’')]
+
+
+def draw_messages(rng, keyword):
+    n = len(keyword)
+    variants = np.array([keyword_variants(k) for k in KEYWORDS], dtype=object)
+    prefixes = np.array(MESSAGE_PREFIXES, dtype=object)
+    suffixes = np.array(MESSAGE_SUFFIXES, dtype=object)
+
+    messages = (prefixes[rng.integers(0, len(prefixes), n)]
+                + variants[keyword, rng.integers(0, variants.shape[1], n)]
+                + suffixes[rng.integers(0, len(suffixes), n)])
+    second = rng.random(n) < SECOND_KEYWORD_P
+    other = rng.integers(0, len(KEYWORDS), int(second.sum()))
+    messages[second] = messages[second] + ' and ' + variants[other, 0]
+    return messages
+
+
+@lru_cache(maxsize=None)
+def keyword_matcher():
+    return KeywordMatcher(KEYWORDS)
+
+
+def tag_keywords(messages):
+    """Match KEYWORDS in raw text; returns (first keyword code or -1, keyword bit mask)."""
+    matcher = keyword_matcher()
+    masks = matcher.masks(messages)
+    matched = matcher.unpack(masks)
+    first = np.where(matched.any(axis=1), matched.argmax(axis=1), -1).astype(np.int8)
+    return first, masks[:, 0].astype(KEYWORD_MASK_DTYPE)
+
+
+def to_frame(dates, codes, compact=False):
+    columns = {'date': dates}
+    for name in COLUMNS[1:] + TEXT_COLUMNS:
+        if name not in codes:
+            continue
+        values = codes[name]
+        if name in CATEGORY_DTYPES:
+            dtype = CATEGORY_DTYPES[name]
+            if compact:
+                values = pd.Categorical.from_codes(values, dtype=dtype)
+            else:
+                # Code -1 (no keyword matched) picks the trailing None
+                values = np.array(list(dtype.categories) + [None], dtype=object)[values]
+        elif compact and name in COMPACT_DTYPES:
+            values = values.astype(COMPACT_DTYPES[name])
+        elif name == 'hour':
+            values = values.astype(np.int64)
+        columns[name] = values
+    return pd.DataFrame(columns)
+
+
+def compact_frame(df):
+    """Convert a string/64-bit posts frame to the compact layout."""
+    return df.astype({name: dtype for name, dtype in COMPACT_DTYPES.items() if name in df.columns})
+
+
+def iter_posts(n_rows=None, n_days=180, seed=42, chunk_size=1_000_000, end=None, compact=False, text=False):
+    """Yield the synthetic posts as DataFrames of at most chunk_size rows, in date order.
+
+    Rows are drawn in fixed blocks of BLOCK_ROWS, each with its own seed,
+    and chunks are cut from those blocks, so the posts are the same
+    whatever the chunk size. With text=True every post gets a message and
+    its keyword columns come from matching that text instead of the drawn
+    keyword.
+    """
+    end = pd.Timestamp(end if end is not None else datetime.now()).normalize()
+    dates = pd.date_range(end=end, periods=n_days, freq='D').values
+
+    counts = day_counts(n_rows, n_days, seed)
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    total = int(bounds[-1])
+    chunk_size = chunk_size or max(total, 1)
+
+    block, block_codes = None, None
+    for start in range(0, total, chunk_size):
+        stop = min(start + chunk_size, total)
+        parts = []
+        for index in range(start // BLOCK_ROWS, (stop - 1) // BLOCK_ROWS + 1):
+            first = index * BLOCK_ROWS
+            if index != block:
+                # Consecutive chunks share their edge block, so it is drawn once
+                block, block_codes = index, draw_block(seed, index, min(BLOCK_ROWS, total - first), text)
+            lo, hi = max(start, first) - first, min(stop, first + BLOCK_ROWS) - first
+            parts.append({name: values[lo:hi] for name, values in block_codes.items()})
+        codes = parts[0] if len(parts) == 1 else {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        day = np.searchsorted(bounds, np.arange(start, stop), side='right') - 1
+        yield to_frame(dates[day], codes, compact)
+
+
+def draw_block(seed, index, n, text=False):
+    rng = np.random.default_rng([seed, 1, index])
+    codes = draw_columns(rng, n)
+    if text:
+        codes['message'] = draw_messages(rng, codes['keyword'])
+        codes['keyword'], codes['keyword_mask'] = tag_keywords(codes['message'].tolist())
+    return codes
+
+
+def generate_posts(n_rows=None, n_days=180, seed=42, chunk_size=None, end=None, compact=False, text=False):
+    chunks = list(iter_posts(n_rows, n_days, seed, chunk_size, end, compact, text))
+    if not chunks:
+        empty = draw_columns(np.random.default_rng(seed), 0)
+        return to_frame(np.array([], dtype='datetime64[ns]'), empty, compact)
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
@@ -0,0 +1,174 @@
+"""Date-partitioned Parquet storage for the posts table.
+
+    python dataset.py /data/posts --rows 10000000
+
+writes <path>/date=YYYY-MM-DD/part-*.parquet. Files are read memory-mapped,
+only the requested columns are decoded, and filters on date, platform and
+risk level are pushed down to partition and row-group pruning.
+"""
+import argparse
+import os
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+from data import COLUMNS, KEYWORD_MASK_DTYPE, TEXT_COLUMNS, compact_frame, iter_posts
+
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.date32())]), flavor='hive')
+
+# Rows are sorted by (date, platform, risk_level) inside each partition so that
+# row-group min/max statistics can skip platforms and risk levels too
+SORT_COLUMNS = ['date', 'platform', 'risk_level']
+
+# Categoricals are stored as plain strings: Parquet dictionary-encodes them on
+# disk anyway, and Arrow only prunes row groups on statistics of plain columns
+FILE_SCHEMA = pa.schema([
+    ('date', pa.date32()),
+    ('platform', pa.string()),
+    ('risk_level', pa.string()),
+    ('severity_score', pa.float32()),
+    ('hour', pa.int8()),
+    ('sentiment', pa.string()),
+    ('intervention', pa.bool_()),
+    ('keyword', pa.string()),
+    ('message', pa.string()),
+    ('keyword_mask', pa.from_numpy_dtype(KEYWORD_MASK_DTYPE)),
+])
+ROW_GROUP_SIZE = 16 * 1024
+
+# Measured working set per chunk row while aggregating (Arrow batches, the
+# compact frame and the bincount index/weight temporaries)
+CHUNK_ROW_BYTES = 160
+# The same with message text: the Python strings, the keyword matcher's and
+# the phrase sketches' tokenising temporaries
+TEXT_CHUNK_ROW_BYTES = 1700
+
+
+def write_dataset(path, chunks):
+    """Append posts frames (e.g. from data.iter_posts) to a partitioned dataset."""
+    for i, chunk in enumerate(chunks):
+        chunk = compact_frame(chunk).sort_values(SORT_COLUMNS, kind='stable')
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        table = table.cast(pa.schema([FILE_SCHEMA.field(name) for name in table.column_names]))
+        ds.write_dataset(
+            table,
+            path,
+            format='parquet',
+            partitioning=PARTITIONING,
+            basename_template=f'part-{i}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore',
+            max_rows_per_group=ROW_GROUP_SIZE,
+        )
+
+
+CATEGORY_COLUMNS = ['platform', 'risk_level', 'sentiment', 'keyword']
+
+# Decode categorical columns straight into Arrow dictionaries (pandas categoricals)
+READ_FORMAT = ds.ParquetFileFormat(read_options=ds.ParquetReadOptions(dictionary_columns=CATEGORY_COLUMNS))
+
+
+def read_schema(schema):
+    return pa.schema([
+        pa.field(f.name, pa.dictionary(pa.int32(), pa.string())) if f.name in CATEGORY_COLUMNS else f
+        for f in schema
+    ])
+
+
+def open_dataset(path, filters=None):
+    """Dataset over the partitions and row groups that can match filters.
+
+    Pruning runs against the plain-string file schema (statistics are not
+    used for dictionary columns); the surviving row groups are then read
+    memory-mapped with categoricals decoded as dictionaries.
+    """
+    filesystem = pafs.LocalFileSystem(use_mmap=True)
+    plain = ds.dataset(os.path.abspath(path), format='parquet', partitioning=PARTITIONING, filesystem=filesystem)
+    expression = filter_expression(filters)
+
+    fragments = []
+    for fragment in plain.get_fragments(filter=expression):
+        if expression is None:
+            row_groups = None
+        else:
+            row_groups = [rg.id for piece in fragment.split_by_row_group(expression, plain.schema) for rg in piece.row_groups]
+            if not row_groups:
+                continue
+        fragments.append(READ_FORMAT.make_fragment(
+            fragment.path, filesystem, partition_expression=fragment.partition_expression, row_groups=row_groups
+        ))
+    return ds.FileSystemDataset(fragments, read_schema(plain.schema), READ_FORMAT, filesystem)
+
+
+def filter_expression(filters):
+    # Arrow expression for a FilterState; None reads everything
+    if filters is None:
+        return None
+    return (
+        (ds.field('date') >= pa.scalar(filters.date_from.date(), pa.date32())) &
+        (ds.field('date') <= pa.scalar(filters.date_to.date(), pa.date32())) &
+        ds.field('platform').isin(list(filters.platforms)) &
+        ds.field('risk_level').isin(list(filters.risk_levels))
+    )
+
+
+def to_frame(table):
+    df = table.to_pandas(date_as_object=False)
+    df = df[[c for c in COLUMNS + TEXT_COLUMNS if c in df.columns]]
+    return compact_frame(df)
+
+
+def read_posts(path, columns=None, filters=None):
+    """Read the selected columns of the posts matching filters as a compact frame."""
+    table = open_dataset(path, filters).to_table(columns=columns, filter=filter_expression(filters))
+    return to_frame(table)
+
+
+def has_text(path):
+    return 'message' in open_dataset(path).schema.names
+
+
+def chunk_rows_for(memory_mb, text=False):
+    # Largest chunk that keeps the per-chunk working set under memory_mb
+    return max(ROW_GROUP_SIZE, memory_mb * 2**20 // (TEXT_CHUNK_ROW_BYTES if text else CHUNK_ROW_BYTES))
+
+
+def iter_frames(path, chunk_rows=1_000_000, columns=None, filters=None):
+    """Yield the matching posts as compact frames of about chunk_rows rows.
+
+    Row groups are read one at a time without readahead, so memory stays
+    bounded by chunk_rows whatever the size of the dataset.
+    """
+    batches = open_dataset(path, filters).to_batches(
+        columns=columns,
+        filter=filter_expression(filters),
+        batch_readahead=0,
+        fragment_readahead=1,
+    )
+    pending, size = [], 0
+    for batch in batches:
+        pending.append(batch)
+        size += batch.num_rows
+        if size >= chunk_rows:
+            yield to_frame(pa.Table.from_batches(pending))
+            pending, size = [], 0
+    if pending:
+        yield to_frame(pa.Table.from_batches(pending))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write the synthetic posts as a partitioned Parquet dataset')
+    parser.add_argument('path')
+    parser.add_argument('--rows', type=int, default=None)
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--text', action='store_true', help='store message text and matched keywords')
+    args = parser.parse_args()
+
+    chunks = iter_posts(args.rows, args.days, args.seed, args.chunk_size, compact=True, text=args.text)
+    write_dataset(args.path, chunks)
+
+
+if __name__ == '__main__':
+    main()
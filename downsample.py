@@ -0,0 +1,43 @@
+"""Reduce chart series to a point budget before they are sent to the browser.
+
+Time series use Largest-Triangle-Three-Buckets (LTTB): the first and last
+points are kept and every bucket in between contributes the point forming
+the largest triangle with the previous pick and the next bucket's average,
+which keeps peaks and dips that plain striding or averaging would lose.
+"""
+import numpy as np
+
+
+def lttb(x, y, n_out):
+    """Indices of at most n_out points of the series (x ascending) chosen by LTTB."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        # No room for inner buckets: the end points, as many as the budget allows
+        return np.array([0, n - 1][:max(n_out, 0)], dtype=np.int64)
+
+    # Bucket edges for the n - 2 inner points, plus the last point as the final bucket
+    every = (n - 2) / (n_out - 2)
+    bounds = np.append((np.arange(n_out - 1) * every).astype(np.int64) + 1, n)
+
+    picks = np.empty(n_out, dtype=np.int64)
+    picks[0], picks[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop, after = bounds[i], bounds[i + 1], bounds[i + 2]
+        avg_x, avg_y = x[stop:after].mean(), y[stop:after].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        picks[i + 1] = a
+    return picks
+
+
+def largest(values, n_out):
+    """Indices of the n_out largest values, in their original order (for scatter plots)."""
+    values = np.asarray(values)
+    if n_out >= len(values):
+        return np.arange(len(values))
+    return np.sort(np.argpartition(values, len(values) - n_out)[-n_out:])
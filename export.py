@@ -0,0 +1,163 @@
+"""Columnar export of the filtered posts and the tab tables, as Arrow IPC or Parquet.
+
+    python export.py exports/ --format parquet --platforms Reddit --from 2026-05-01 --to 2026-05-31 [--data /data/posts]
+
+Posts are written as a stream of record batches. Each batch is a slice of
+the in-memory columns handed to Arrow without copying, then cut down to the
+selected rows by Arrow's filter kernel. From a Parquet dataset the batches
+are read with the filter pushed down instead. Either way memory stays at
+about one batch whatever the size of the selection, and nothing goes
+through Python rows or CSV. Tables (platform_stats, keyword_stats,
+monthly_stats, hourly_pivot) come from the cube and are a few rows each.
+"""
+import argparse
+import json
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from analytics import FilterState, aggregate_posts, peak_rss_mb, summarize
+from data import COLUMNS, PLATFORMS, RISK_LEVELS, TEXT_COLUMNS, iter_posts
+from dataset import chunk_rows_for, filter_expression, open_dataset
+from report import table_frame
+
+# Format -> (file extension, MIME type)
+FORMATS = {
+    'arrow': ('.arrow', 'application/vnd.apache.arrow.stream'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+}
+TABLES = ['platform_stats', 'keyword_stats', 'monthly_stats', 'hourly_pivot']
+BATCH_ROWS = 256 * 1024
+
+
+def frame_mask(df, filters):
+    return (df['date'].between(filters.date_from, filters.date_to).to_numpy()
+            & df['platform'].isin(filters.platforms).to_numpy()
+            & df['risk_level'].isin(filters.risk_levels).to_numpy())
+
+
+def frame_batches(frames, filters, batch_rows=BATCH_ROWS):
+    """Record batches of the posts matching filters, from an iterable of posts frames.
+
+    Yields an empty batch when nothing matches so writers still get a schema.
+    """
+    written, empty = False, None
+    for df in frames:
+        for start in range(0, max(len(df), 1), batch_rows):
+            chunk = df.iloc[start:start + batch_rows]
+            batch = pa.RecordBatch.from_pandas(chunk, preserve_index=False)
+            keep = frame_mask(chunk, filters)
+            if keep.any():
+                written = True
+                yield export_batch(batch.filter(keep))
+            elif empty is None:
+                empty = batch.slice(0, 0)
+    if not written and empty is not None:
+        yield export_batch(empty)
+
+
+def dataset_batches(path, filters, batch_rows=BATCH_ROWS):
+    """Record batches of a Parquet dataset's posts matching filters, pruned and filtered while reading."""
+    dataset = open_dataset(path, filters)
+    columns = [c for c in COLUMNS + TEXT_COLUMNS if c in dataset.schema.names]
+    scanner = dataset.scanner(
+        columns=columns, filter=filter_expression(filters), batch_size=batch_rows, batch_readahead=0, fragment_readahead=1
+    )
+    empty = True
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            empty = False
+            yield export_batch(batch)
+    if empty:
+        yield export_batch(pa.RecordBatch.from_pylist([], schema=scanner.projected_schema))
+
+
+def export_batch(batch):
+    # Dates as date32 whichever source they came from, as dataset.py stores them
+    index = batch.schema.get_field_index('date')
+    if index >= 0 and pa.types.is_timestamp(batch.schema.field(index).type):
+        batch = batch.set_column(index, 'date', pc.cast(batch.column(index), pa.date32()))
+    return batch
+
+
+def table_batches(frame):
+    """A tab table as record batches, without its pandas index."""
+    return pa.Table.from_pandas(frame, preserve_index=False).to_batches() or \
+        [pa.RecordBatch.from_pandas(frame, preserve_index=False)]
+
+
+def write_batches(sink, batches, fmt):
+    """Write record batches to a path or binary file as one Arrow IPC stream or Parquet file.
+
+    Returns the number of rows written; batches is consumed once, so memory is one batch.
+    """
+    writer = None
+    rows = 0
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = pa.ipc.new_stream(sink, batch.schema) if fmt == 'arrow' else pq.ParquetWriter(sink, batch.schema)
+            if batch.num_rows:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def to_bytes(batches, fmt):
+    """The encoded file in memory, e.g. for st.download_button."""
+    sink = pa.BufferOutputStream()
+    write_batches(sink, batches, fmt)
+    return sink.getvalue().to_pybytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the filtered posts and the tab tables')
+    parser.add_argument('out', help='output directory')
+    parser.add_argument('--data', help='Parquet dataset written by dataset.py (default: synthetic posts)')
+    parser.add_argument('--rows', type=int, default=None, help='synthetic row count')
+    parser.add_argument('--memory-mb', type=int, default=256, help='working memory per chunk')
+    parser.add_argument('--platforms', nargs='+', default=PLATFORMS, choices=PLATFORMS)
+    parser.add_argument('--risk-levels', nargs='+', default=RISK_LEVELS, choices=RISK_LEVELS)
+    parser.add_argument('--from', dest='date_from', help='first day (default: the first day of the data)')
+    parser.add_argument('--to', dest='date_to', help='last day (default: the last day of the data)')
+    parser.add_argument('--format', choices=list(FORMATS), default='parquet')
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cube = aggregate_posts(args.data, args.rows, args.memory_mb)
+    date_range = (args.date_from or cube.first_date, args.date_to or cube.last_date)
+    filters = FilterState.from_sidebar(args.platforms, args.risk_levels, date_range)
+    stats = summarize(cube, filters)
+    extension = FORMATS[args.format][0]
+    os.makedirs(args.out, exist_ok=True)
+    for table in TABLES:
+        write_batches(os.path.join(args.out, table + extension), table_batches(table_frame(stats, table)), args.format)
+
+    if args.data:
+        batches = dataset_batches(args.data, filters, args.batch_rows)
+    else:
+        chunks = iter_posts(args.rows, chunk_size=chunk_rows_for(args.memory_mb), compact=True)
+        batches = frame_batches(chunks, filters, args.batch_rows)
+    exported = time.perf_counter()
+    rows = write_batches(os.path.join(args.out, 'posts' + extension), batches, args.format)
+    seconds = time.perf_counter() - exported
+    print(json.dumps({
+        'posts': rows,
+        'expected_posts': stats.total_posts,
+        'export_seconds': round(seconds, 2),
+        'posts_per_second': round(rows / seconds) if seconds else None,
+        'total_seconds': round(time.perf_counter() - start, 2),
+        'peak_rss_mb': round(peak_rss_mb()),
+        'out': args.out,
+    }))
+
+
+if __name__ == '__main__':
+    main()
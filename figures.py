@@ -0,0 +1,341 @@
+"""Plotly figures for the dashboard tabs and a cache of built figures.
+
+Each figure depends only on the DashboardStats of one filter state, so built
+figures are kept in an LRU cache keyed on (figure name, FilterState, data
+version) and shared by every session: going back to an earlier selection skips both the
+aggregation and the Plotly construction. Cached figures are treated as
+read-only.
+
+Long or dense series are cut to a per-chart point budget (config.POINT_BUDGETS)
+and switch to WebGL traces above config.WEBGL_POINTS, so the browser never
+receives more points than it can draw.
+
+Plotly is imported when the first figure is built, not with this module.
+"""
+import contextlib
+import functools
+import importlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import config
+from anomalies import describe
+from cube import GRANULARITIES
+from downsample import largest, lttb
+
+
+class LazyModule:
+    """Imports the named module on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+# plotly.express alone is most of the app's import time; a process only pays for it
+# once it builds its first figure
+px = LazyModule('plotly.express')
+go = LazyModule('plotly.graph_objects')
+
+RISK_COLORS = {'Low': '#10B981', 'Medium': '#F59E0B', 'High': '#EF4444', 'Critical': '#7F1D1D'}
+SENTIMENT_COLORS = {'Positive': '#10B981', 'Neutral': '#94A3B8', 'Negative': '#EF4444'}
+
+
+def render_mode(n_points):
+    # n_points is the series length before downsampling, so long series switch to WebGL
+    # whatever their point budget
+    return 'webgl' if n_points > config.WEBGL_POINTS else 'svg'
+
+
+def risk_pie(stats):
+    risk_counts = stats.risk_counts
+    fig = px.pie(
+        values=risk_counts.values,
+        names=risk_counts.index,
+        color=risk_counts.index,
+        color_discrete_map=RISK_COLORS,
+        hole=0.4
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(height=400, showlegend=True)
+    return fig
+
+
+def high_risk_bar(stats):
+    fig = px.bar(
+        stats.high_risk_by_platform,
+        x='platform',
+        y='count',
+        color='count',
+        color_continuous_scale='Reds',
+        text='count'
+    )
+    fig.update_traces(textposition='outside')
+    fig.update_layout(height=400, showlegend=False, xaxis_title="Platform", yaxis_title="High-Risk Posts")
+    return fig
+
+
+def platform_bars(stats):
+    platform_stats = stats.platform_stats
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        name='Total Posts',
+        x=platform_stats['Platform'],
+        y=platform_stats['Total Posts'],
+        marker_color='lightblue'
+    ))
+    fig.add_trace(go.Bar(
+        name='Interventions',
+        x=platform_stats['Platform'],
+        y=platform_stats['Interventions'],
+        marker_color='red'
+    ))
+    fig.update_layout(
+        barmode='group',
+        height=400,
+        title="Posts vs Interventions by Platform"
+    )
+    return fig
+
+
+def hourly_sentiment(stats):
+    hourly_pivot = stats.hourly_pivot
+    fig = go.Figure()
+    for sentiment in ['Positive', 'Neutral', 'Negative']:
+        if sentiment in hourly_pivot.columns:
+            fig.add_trace(go.Scatter(
+                x=hourly_pivot.index,
+                y=hourly_pivot[sentiment],
+                mode='lines+markers',
+                name=sentiment,
+                line=dict(width=3, color=SENTIMENT_COLORS[sentiment]),
+                marker=dict(size=8)
+            ))
+    fig.update_layout(
+        height=400,
+        xaxis_title="Hour of Day",
+        yaxis_title="Number of Posts",
+        hovermode='x unified'
+    )
+    return fig
+
+
+def keyword_matrix(stats):
+    keyword_stats = stats.keyword_stats
+    mode = render_mode(len(keyword_stats))
+    # A scatter has no order to preserve: keep the most frequent (largest) markers
+    keyword_stats = keyword_stats.iloc[largest(keyword_stats['Frequency'], config.POINT_BUDGETS['keyword_matrix'])]
+    fig = px.scatter(
+        keyword_stats,
+        x='Frequency',
+        y='Avg Severity',
+        size='Frequency',
+        color='Avg Severity',
+        text='Keyword',
+        color_continuous_scale='Reds',
+        size_max=60,
+        render_mode=mode
+    )
+    fig.update_traces(textposition='top center')
+    fig.update_layout(
+        height=500,
+        xaxis_title="Frequency of Appearance",
+        yaxis_title="Average Severity Score",
+        title="Keyword Risk Matrix"
+    )
+    return fig
+
+
+def timeline(stats, granularity):
+    timeline = stats.timelines[granularity]
+    # Both lines share the points picked on the incident series so hover stays aligned
+    trace = go.Scattergl if render_mode(len(timeline)) == 'webgl' else go.Scatter
+    picks = lttb(timeline['Period'].to_numpy().astype(np.int64), timeline['Incidents'], config.POINT_BUDGETS['timeline'])
+    timeline = timeline.iloc[picks]
+    # Markers only while they stay readable
+    mode = 'lines+markers' if len(timeline) <= 100 else 'lines'
+    fig = go.Figure()
+    fig.add_trace(trace(
+        x=timeline['Period'],
+        y=timeline['Incidents'],
+        mode=mode,
+        name='Incidents Detected',
+        line=dict(color='#EF4444', width=3),
+        marker=dict(size=10)
+    ))
+    fig.add_trace(trace(
+        x=timeline['Period'],
+        y=timeline['Interventions'],
+        mode=mode,
+        name='Interventions Made',
+        line=dict(color='#10B981', width=3),
+        marker=dict(size=10)
+    ))
+    fig.update_layout(
+        height=400,
+        xaxis_title=granularity.capitalize(),
+        yaxis_title="Count",
+        hovermode='x unified',
+        title="Incident & Intervention Timeline"
+    )
+    return fig
+
+
+# Anomaly metric -> (legend label, colour) on the daily severity chart
+ANOMALY_MARKERS = {
+    'severity': ('Unusual severity', '#7C3AED'),
+    'high_risk_share': ('Unusual high-risk share', '#F59E0B'),
+    'volume': ('Unusual volume', '#2563EB'),
+}
+
+
+def daily_severity(stats):
+    daily = stats.daily_severity
+    mode = render_mode(len(daily))
+    picks = lttb(daily['date'].to_numpy().astype(np.int64), daily['severity_score'], config.POINT_BUDGETS['daily_severity'])
+    daily = daily.iloc[picks]
+    # px.area has no WebGL mode; a filled line draws the same single-series area
+    fig = px.line(
+        daily,
+        x='date',
+        y='severity_score',
+        title="Average Daily Severity Score",
+        color_discrete_sequence=['#EF4444'],
+        render_mode=mode
+    )
+    fig.update_traces(fill='tozeroy')
+    anomalies = stats.platform_anomalies
+    if anomalies is not None and len(anomalies):
+        # Flagged days sit on the line: one marker per metric and day, every platform in its hover text
+        line = stats.daily_severity.set_index('date')['severity_score']
+        for metric, (label, color) in ANOMALY_MARKERS.items():
+            flagged = anomalies[anomalies['metric'] == metric]
+            if not len(flagged):
+                continue
+            text = flagged.assign(text=flagged.apply(describe, axis=1)).groupby('date')['text'].agg('<br>'.join)
+            fig.add_trace(go.Scatter(
+                x=text.index,
+                y=line.reindex(text.index),
+                mode='markers',
+                name=label,
+                text=text.to_numpy(),
+                hovertemplate='%{text}<extra></extra>',
+                marker=dict(color=color, size=11, symbol='diamond', line=dict(color='white', width=1))
+            ))
+    fig.update_layout(
+        height=350,
+        xaxis_title="Date",
+        yaxis_title="Average Severity Score"
+    )
+    return fig
+
+
+def daily_percentiles(stats):
+    # stats is a sketches.SketchStats; one pick set keeps the three lines aligned on hover
+    daily = stats.daily_percentiles
+    mode = render_mode(3 * len(daily))
+    picks = lttb(daily['date'].to_numpy().astype(np.int64), daily['p90'], config.POINT_BUDGETS['daily_severity'])
+    daily = daily.iloc[picks]
+    fig = px.line(
+        daily,
+        x='date',
+        y=['p50', 'p90', 'p99'],
+        title="Daily Severity Percentiles (approximate)",
+        color_discrete_sequence=['#F59E0B', '#EF4444', '#7F1D1D'],
+        render_mode=mode
+    )
+    fig.update_layout(
+        height=350,
+        xaxis_title="Date",
+        yaxis_title="Severity Score",
+        legend_title_text="Percentile",
+        hovermode='x unified'
+    )
+    return fig
+
+
+# Stats table each figure is drawn from, aggregated (and timed) before the build
+FIGURE_TABLES = {
+    'risk_pie': 'risk_counts',
+    'high_risk_bar': 'high_risk_by_platform',
+    'platform_bars': 'platform_stats',
+    'hourly_sentiment': 'hourly_pivot',
+    'keyword_matrix': 'keyword_stats',
+    'daily_severity': 'daily_severity',
+    'daily_percentiles': 'daily_percentiles',
+}
+
+FIGURES = {
+    'risk_pie': risk_pie,
+    'high_risk_bar': high_risk_bar,
+    'platform_bars': platform_bars,
+    'hourly_sentiment': hourly_sentiment,
+    'keyword_matrix': keyword_matrix,
+    'daily_severity': daily_severity,
+    'daily_percentiles': daily_percentiles,
+}
+
+# One timeline figure per granularity, all from the same rollups
+for granularity in GRANULARITIES:
+    FIGURE_TABLES[f'timeline_{granularity}'] = 'timelines'
+    FIGURES[f'timeline_{granularity}'] = functools.partial(timeline, granularity=granularity)
+
+
+class FigureCache:
+    """Bounded LRU cache of built figures, safe to share between sessions."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name, filters, stats, timer=None, version=0):
+        """Figure `name` for filters, built from stats on a miss.
+
+        version identifies the data behind stats (it changes as streamed posts
+        arrive), so figures of older data are never served.
+
+        timer (a profiling.RerunTimer) times the aggregation and the build
+        separately; a hit does neither.
+        """
+        key = (name, filters, version)
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return fig
+            self.misses += 1
+
+        # Build outside the lock; two sessions racing on one key both build it
+        phase = timer.phase if timer else lambda _: contextlib.nullcontext()
+        table = FIGURE_TABLES[name]
+        if table not in vars(stats):
+            # Not derived yet by the tab itself (cached_property lives in __dict__)
+            with phase(f'aggregate:{table}'):
+                getattr(stats, table)
+        with phase(f'figure:{name}'):
+            fig = FIGURES[name](stats)
+        with self._lock:
+            self._figures[key] = fig
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return fig
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._figures)
@@ -0,0 +1,136 @@
+"""Multi-pattern risk keyword matching over raw message text.
+
+The keyword list is compiled once into an Aho-Corasick automaton over a
+small alphabet (letters, digits and a word boundary). Text is normalised
+the same way as the keywords: lower case, apostrophes dropped ("can't",
+"can’t" and "cant" are the same word) and any other character treated as a
+word boundary, so "end it" matches "...END IT." but not "spend it".
+
+Batches are matched column-wise: the automaton state of every message in a
+block advances one character per NumPy step, so the Python loop runs once
+per character position, not once per message.
+"""
+from collections import deque
+
+import numpy as np
+
+BOUNDARY = 0
+ALPHABET = 37  # boundary, a-z, 0-9
+BLOCK_SIZE = 4096
+
+# Byte -> symbol; everything that is not a letter or digit is a boundary
+SYMBOLS = np.zeros(256, dtype=np.int32)
+SYMBOLS[np.frombuffer(b'abcdefghijklmnopqrstuvwxyz', np.uint8)] = np.arange(1, 27)
+SYMBOLS[np.frombuffer(b'0123456789', np.uint8)] = np.arange(27, 37)
+
+APOSTROPHES = str.maketrans('', '', '\'‘’ʼ`')
+
+
+def normalize(texts):
+    # Lower-cased ASCII bytes without apostrophes, one per text
+    joined = '\x00'.join(texts).lower().translate(APOSTROPHES)
+    return joined.encode('ascii', 'replace').split(b'\x00')
+
+
+def to_symbols(text):
+    return SYMBOLS[np.frombuffer(text, np.uint8)]
+
+
+def mask_dtype(n_keywords):
+    # Narrowest unsigned integer holding one bit per keyword
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if n_keywords <= np.iinfo(dtype).bits:
+            return dtype
+    raise ValueError('keyword masks support at most 64 keywords')
+
+
+class KeywordMatcher:
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self.words = (len(self.keywords) + 63) // 64
+        self.delta, self.output = self._compile()
+
+    def _compile(self):
+        # Trie over boundary-delimited patterns
+        goto = [{}]
+        output = [0]
+        for i, text in enumerate(normalize(self.keywords)):
+            symbols = to_symbols(text)
+            words = [w for w in np.split(symbols, np.flatnonzero(symbols == BOUNDARY)) if len(w)]
+            pattern = [BOUNDARY]
+            for word in words:
+                pattern.extend(s for s in word.tolist() if s != BOUNDARY)
+                pattern.append(BOUNDARY)
+            state = 0
+            for symbol in pattern:
+                if symbol not in goto[state]:
+                    goto.append({})
+                    output.append(0)
+                    goto[state][symbol] = len(goto) - 1
+                state = goto[state][symbol]
+            output[state] |= 1 << i
+
+        # Breadth-first failure links folded into a dense transition table
+        delta = np.zeros((len(goto), ALPHABET), dtype=np.int32)
+        fail = [0] * len(goto)
+        last = [BOUNDARY] * len(goto)
+        queue = deque()
+        for symbol, child in goto[0].items():
+            delta[0, symbol] = child
+            last[child] = symbol
+            queue.append(child)
+        while queue:
+            state = queue.popleft()
+            output[state] |= output[fail[state]]
+            delta[state] = delta[fail[state]]
+            for symbol, child in goto[state].items():
+                fail[child] = delta[fail[state], symbol]
+                delta[state, symbol] = child
+                last[child] = symbol
+                queue.append(child)
+
+        # A run of boundaries counts as one, as if whitespace were collapsed
+        for state in range(1, len(goto)):
+            if last[state] == BOUNDARY:
+                delta[state, BOUNDARY] = state
+
+        words = np.zeros((len(goto), self.words), dtype=np.uint64)
+        for state, bits in enumerate(output):
+            for w in range(self.words):
+                words[state, w] = (bits >> (64 * w)) & (2**64 - 1)
+        return delta.ravel(), words
+
+    def masks(self, messages):
+        """Bit set of matched keywords per message, shape (n, ceil(k / 64))."""
+        texts = normalize(messages) if len(messages) else []
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        result = np.zeros((len(texts), self.words), dtype=np.uint64)
+        order = np.argsort(lengths, kind='stable')
+
+        # Length-sorted blocks keep the padding per block small
+        for begin in range(0, len(order), BLOCK_SIZE):
+            rows = order[begin:begin + BLOCK_SIZE]
+            width = max(int(lengths[rows[-1]]), 1)
+            chars = np.array([texts[i] for i in rows], dtype=f'S{width}').view(np.uint8)
+            symbols = np.asfortranarray(SYMBOLS[chars.reshape(len(rows), width)])
+
+            state = np.full(len(rows), self.delta[BOUNDARY], dtype=np.int32)
+            hits = np.zeros((len(rows), self.words), dtype=np.uint64)
+            for column in symbols.T:
+                state = self.delta[state * ALPHABET + column]
+                hits |= self.output[state]
+            state = self.delta[state * ALPHABET + BOUNDARY]
+            hits |= self.output[state]
+            result[rows] = hits
+        return result
+
+    def unpack(self, masks):
+        bits = np.arange(len(self.keywords))
+        return ((masks[:, bits // 64] >> (bits % 64).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+    def match(self, messages):
+        """Boolean matrix (n messages, k keywords) of every keyword found."""
+        return self.unpack(self.masks(messages))
+
+    def findall(self, messages):
+        return [[self.keywords[k] for k in np.flatnonzero(row)] for row in self.match(messages)]
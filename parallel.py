@@ -0,0 +1,93 @@
+"""Build the cube on several cores, one task per calendar month.
+
+Every cube cell belongs to a single day, so month partitions fill disjoint
+cells: merging the partial tables is exact and gives bit-identical sums to
+the serial build (means are always severity sum / count, never averaged).
+"""
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from analytics import FilterState
+from cube import CubeBuilder, cube_tables
+from data import PLATFORMS, RISK_LEVELS
+from dataset import iter_frames, open_dataset
+
+# Frame shared with forked workers, which inherit it instead of unpickling slices
+_frame = None
+
+
+def make_pool(workers, threads=False):
+    # Forked processes are for single-threaded callers (the CLIs); threaded ones pass threads=True
+    if threads or 'fork' not in mp.get_all_start_methods():
+        return ThreadPoolExecutor(workers)
+    return ProcessPoolExecutor(workers, mp_context=mp.get_context('fork'))
+
+
+def month_bounds(df):
+    """Row bounds of each month, sorting the frame by month first if needed."""
+    months = df['date'].to_numpy().astype('datetime64[M]')
+    if len(months) and (np.diff(months.astype(np.int64)) < 0).any():
+        # Stable, so rows keep their order inside a month
+        order = np.argsort(months, kind='stable')
+        df, months = df.iloc[order], months[order]
+    edges = np.flatnonzero(months[1:] != months[:-1]) + 1
+    bounds = np.concatenate([[0], edges, [len(months)]])
+    return df, list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def _aggregate_rows(bounds):
+    start, stop = bounds
+    return cube_tables(_frame.iloc[start:stop])
+
+
+def build_cube_parallel(df, workers=4, threads=False):
+    global _frame
+    df, partitions = month_bounds(df)
+    builder = CubeBuilder()
+    if workers <= 1:
+        for start, stop in partitions:
+            builder.add_tables(*cube_tables(df.iloc[start:stop]))
+        return builder.build()
+
+    _frame = df
+    try:
+        with make_pool(workers, threads) as pool:
+            for tables in pool.map(_aggregate_rows, partitions):
+                builder.add_tables(*tables)
+    finally:
+        _frame = None
+    return builder.build()
+
+
+def dataset_months(path):
+    # (first day, last day) of every month present in the dataset's partitions
+    days = sorted({
+        pd.Timestamp(ds.get_partition_keys(fragment.partition_expression)['date'])
+        for fragment in open_dataset(path).get_fragments()
+    })
+    months = pd.Series(days).dt.to_period('M').unique()
+    return [(month.start_time, month.end_time.normalize()) for month in months]
+
+
+def _aggregate_dataset_month(task):
+    path, date_from, date_to, chunk_rows = task
+    filters = FilterState(tuple(PLATFORMS), tuple(RISK_LEVELS), date_from, date_to)
+    builder = CubeBuilder()
+    for chunk in iter_frames(path, chunk_rows, filters=filters):
+        builder.add(chunk)
+    return builder.start, builder.posts, builder.keywords
+
+
+def build_cube_parallel_dataset(path, workers=4, chunk_rows=1_000_000, threads=False):
+    """Each worker reads and aggregates its own month partitions of a Parquet dataset."""
+    tasks = [(path, date_from, date_to, chunk_rows) for date_from, date_to in dataset_months(path)]
+    builder = CubeBuilder()
+    with make_pool(max(workers, 1), threads) as pool:
+        for start, posts, keywords in pool.map(_aggregate_dataset_month, tasks):
+            if posts is not None:
+                builder.add_tables(start, posts, keywords)
+    return builder.build()
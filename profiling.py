@@ -0,0 +1,120 @@
+"""Opt-in timing of the named phases of each script rerun.
+
+A RerunTimer collects (phase, seconds) pairs for one rerun: data load,
+filter, each table's aggregation, each figure build and each render call.
+When profiling is off its phase() is a no-op context. TimingLog is shared by
+the whole process; it counts reruns per session, keeps a window of recent
+rerun and phase latencies for p50/p95/p99, and can append every rerun to a
+JSON lines file and rewrite a Prometheus text file for a local scraper.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class RerunTimer:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.phases = []
+        self.started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def phase(self, name):
+        return self._timed(name) if self.enabled else contextlib.nullcontext()
+
+    def totals(self):
+        # Seconds per phase name, summing phases entered more than once
+        totals = {}
+        for name, seconds in self.phases:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def percentiles(values):
+    if not values:
+        return {q: float('nan') for q in QUANTILES}
+    return dict(zip(QUANTILES, np.quantile(np.fromiter(values, dtype=float), QUANTILES)))
+
+
+class TimingLog:
+    def __init__(self, window=1000, jsonl_path=None, prometheus_path=None):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.reruns = Counter()
+        self.latencies = deque(maxlen=window)
+        self.phase_latencies = defaultdict(lambda: deque(maxlen=window))
+        self.total_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, session, timer):
+        seconds = timer.elapsed
+        with self._lock:
+            self.reruns[session] += 1
+            self.latencies.append(seconds)
+            self.total_seconds += seconds
+            for name, phase_seconds in timer.phases:
+                self.phase_latencies[name].append(phase_seconds)
+            if self.jsonl_path:
+                with open(self.jsonl_path, 'a') as f:
+                    f.write(json.dumps({
+                        'time': time.time(),
+                        'session': session,
+                        'rerun': self.reruns[session],
+                        'seconds': seconds,
+                        'phases': timer.totals(),
+                    }) + '\n')
+            if self.prometheus_path:
+                self._write_prometheus()
+        return seconds
+
+    def latency_percentiles(self):
+        return percentiles(self.latencies)
+
+    def _write_prometheus(self):
+        lines = [
+            '# HELP spa_rerun_seconds Wall time of a dashboard script rerun.',
+            '# TYPE spa_rerun_seconds summary',
+        ]
+        for q, value in percentiles(self.latencies).items():
+            lines.append(f'spa_rerun_seconds{{quantile="{q}"}} {value:.6f}')
+        lines.append(f'spa_rerun_seconds_sum {self.total_seconds:.6f}')
+        lines.append(f'spa_rerun_seconds_count {sum(self.reruns.values())}')
+
+        lines += [
+            '# HELP spa_phase_seconds Wall time of one named phase of a rerun (recent window).',
+            '# TYPE spa_phase_seconds summary',
+        ]
+        for name, values in self.phase_latencies.items():
+            for q, value in percentiles(values).items():
+                lines.append(f'spa_phase_seconds{{phase="{name}",quantile="{q}"}} {value:.6f}')
+
+        lines += [
+            '# HELP spa_session_reruns_total Reruns per browser session.',
+            '# TYPE spa_session_reruns_total counter',
+        ]
+        for session, count in self.reruns.items():
+            lines.append(f'spa_session_reruns_total{{session="{session}"}} {count}')
+
+        # Replace atomically so a scrape never sees a half-written file
+        staging = f'{self.prometheus_path}.tmp'
+        with open(staging, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(staging, self.prometheus_path)
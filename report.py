@@ -0,0 +1,126 @@
+"""Batch reports for many platform x risk level x date window combinations.
+
+    python report.py reports/ --data /data/posts --windows 7 30 90 --workers 4
+
+The posts are aggregated into the cube once; every combination is then a
+window query on it, so no combination rescans raw rows. Workers are forked
+with the cube already in memory and each writes its own tables to
+<out>/<combination>/<table>.parquet (or .json). The headline metrics of
+every combination are collected into <out>/summary.parquet (or .json).
+"""
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+
+from analytics import HIGH_RISK_LEVELS, FilterState, aggregate_posts, summarize
+from cube import COUNT, Cube
+from data import PLATFORMS, RISK_LEVELS
+from parallel import make_pool
+
+TABLES = ['risk_counts', 'high_risk_by_platform', 'platform_stats', 'hourly_pivot',
+          'keyword_stats', 'monthly_stats', 'daily_severity']
+
+METRICS = ['total_posts', 'high_risk', 'interventions', 'avg_severity', 'share_of_total',
+           'high_risk_share', 'intervention_rate', 'top_high_risk_platform']
+
+# Cube shared with forked workers, which inherit it instead of unpickling it per task
+_cube = None
+
+
+def combinations(cube, platforms, risk_levels, windows):
+    """(name, FilterState) for every platform group x risk group x trailing window in days."""
+    platform_groups = [('all', PLATFORMS)] + [(p.lower(), [p]) for p in platforms]
+    risk_groups = [('all', RISK_LEVELS), ('-'.join(HIGH_RISK_LEVELS).lower(), HIGH_RISK_LEVELS)]
+    risk_groups += [(r.lower(), [r]) for r in risk_levels]
+    for days in windows:
+        date_from = max(cube.first_date, cube.last_date - pd.Timedelta(days=days - 1))
+        for platform_name, platform_group in platform_groups:
+            for risk_name, risk_group in risk_groups:
+                filters = FilterState.from_sidebar(platform_group, risk_group, (date_from, cube.last_date))
+                yield f'{platform_name}_{risk_name}_{days}d', filters
+
+
+def table_frame(stats, table):
+    frame = getattr(stats, table)
+    if table == 'risk_counts':
+        return frame.rename_axis('risk_level').reset_index(name='count')
+    if table == 'hourly_pivot':
+        return frame.reset_index()
+    return frame.reset_index(drop=True)
+
+
+def write_frame(frame, path, fmt):
+    if fmt == 'parquet':
+        frame.to_parquet(f'{path}.parquet', index=False)
+    else:
+        frame.to_json(f'{path}.json', orient='records', date_format='iso', indent=2)
+
+
+def _report(task):
+    name, filters, out, fmt = task
+    stats = summarize(_cube, filters)
+    directory = os.path.join(out, name)
+    os.makedirs(directory, exist_ok=True)
+    for table in TABLES:
+        write_frame(table_frame(stats, table), os.path.join(directory, table), fmt)
+    return {
+        'combination': name,
+        'platforms': ','.join(filters.platforms),
+        'risk_levels': ','.join(filters.risk_levels),
+        'date_from': filters.date_from.date().isoformat(),
+        'date_to': filters.date_to.date().isoformat(),
+        **{metric: getattr(stats, metric) for metric in METRICS},
+    }
+
+
+def run_reports(cube, out, tasks, workers=4, fmt='parquet'):
+    global _cube
+    _cube = cube
+    os.makedirs(out, exist_ok=True)
+    tasks = [(name, filters, out, fmt) for name, filters in tasks]
+    try:
+        if workers <= 1:
+            rows = [_report(task) for task in tasks]
+        else:
+            with make_pool(workers) as pool:
+                rows = list(pool.map(_report, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+    finally:
+        _cube = None
+    summary = pd.DataFrame(rows)
+    write_frame(summary, os.path.join(out, 'summary'), fmt)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write dashboard tables for many filter combinations')
+    parser.add_argument('out', help='output directory')
+    parser.add_argument('--data', help='Parquet dataset written by dataset.py (default: synthetic posts)')
+    parser.add_argument('--cube', help='directory of a saved cube (Cube.save), instead of aggregating posts')
+    parser.add_argument('--rows', type=int, default=None, help='synthetic row count')
+    parser.add_argument('--memory-mb', type=int, default=256, help='working memory per chunk while aggregating')
+    parser.add_argument('--platforms', nargs='+', default=PLATFORMS, choices=PLATFORMS)
+    parser.add_argument('--risk-levels', nargs='+', default=RISK_LEVELS, choices=RISK_LEVELS)
+    parser.add_argument('--windows', type=int, nargs='+', default=[7, 30, 90, 180], help='trailing windows in days')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--format', choices=['parquet', 'json'], default='parquet')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cube = Cube.load(args.cube) if args.cube else aggregate_posts(args.data, args.rows, args.memory_mb)
+    built = time.perf_counter()
+    tasks = list(combinations(cube, args.platforms, args.risk_levels, args.windows))
+    summary = run_reports(cube, args.out, tasks, args.workers, args.format)
+    print(json.dumps({
+        'combinations': len(summary),
+        'posts': int(cube.totals()[COUNT]),
+        'aggregate_seconds': round(built - start, 2),
+        'report_seconds': round(time.perf_counter() - built, 2),
+        'out': args.out,
+    }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Vectorised risk scoring rules shared by the generator and the ingest path.
+
+A post's raw model scores in [0, 1) become a risk level (cut-offs on the
+risk score), a severity (the position of the score inside its risk level's
+interval mapped onto that level's severity band, boosted late at night), a
+sentiment bucket (the sentiment score against cut-offs that depend on the
+severity) and an intervention likelihood (proportional to severity). Every
+rule is a whole-array NumPy expression, so a batch costs a handful of passes
+whatever its size. Thresholds live in ScoringRules and can be overridden
+from a JSON file.
+"""
+import json
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class ScoringRules:
+    # Risk score cut-offs between Low | Medium | High | Critical
+    risk_cutoffs: tuple = (0.45, 0.75, 0.90)
+    # Severity band (low, high) per risk level
+    severity_bands: tuple = ((1, 3), (3, 6), (6, 8.5), (8.5, 10))
+    # Inclusive hour range whose severity is multiplied
+    late_night_hours: tuple = (0, 4)
+    late_night_multiplier: float = 1.2
+    # Severity thresholds that pick the sentiment cut-offs below
+    sentiment_severity: tuple = (4, 7)
+    # Sentiment score below negative_cuts[i] is Negative, below neutral_cuts[i] Neutral
+    negative_cuts: tuple = (0.4, 0.7, 0.9)
+    neutral_cuts: tuple = (0.8, 0.95, 1.0)
+    # Intervention likelihood is severity / intervention_divisor
+    intervention_divisor: float = 15
+
+    @classmethod
+    def from_json(cls, path):
+        """Rules with the fields found in a JSON object file overridden."""
+        with open(path) as f:
+            overrides = json.load(f)
+        unknown = set(overrides) - {field.name for field in fields(cls)}
+        if unknown:
+            raise ValueError(f"unknown scoring rules: {', '.join(sorted(unknown))}")
+        return cls(**{name: _freeze(value) for name, value in overrides.items()})
+
+
+def _freeze(value):
+    # JSON lists to (nested) tuples so rules stay hashable
+    return tuple(_freeze(v) for v in value) if isinstance(value, list) else value
+
+
+DEFAULT_RULES = ScoringRules()
+
+
+def load_rules(path=None):
+    return ScoringRules.from_json(path) if path else DEFAULT_RULES
+
+
+def risk_codes(risk_score, rules=DEFAULT_RULES):
+    """Risk level code per post and the score's position inside its level's interval."""
+    risk_score = np.asarray(risk_score, dtype=np.float64)
+    edges = np.array((0.0,) + tuple(rules.risk_cutoffs) + (1.0,))
+    risk = np.searchsorted(edges[1:-1], risk_score, side='right').astype(np.int8)
+    low, high = edges[risk], edges[risk + 1]
+    return risk, (risk_score - low) / (high - low)
+
+
+def severity_scores(risk, position, hour, rules=DEFAULT_RULES):
+    band = np.asarray(rules.severity_bands, dtype=np.float64)[risk]
+    severity = band[:, 0] + (band[:, 1] - band[:, 0]) * position
+    late = (hour >= rules.late_night_hours[0]) & (hour <= rules.late_night_hours[1])
+    severity[late] *= rules.late_night_multiplier
+    return severity
+
+
+def sentiment_codes(severity, sentiment_score, rules=DEFAULT_RULES):
+    band = np.searchsorted(rules.sentiment_severity, severity, side='left')
+    negative_cut = np.asarray(rules.negative_cuts)[band]
+    neutral_cut = np.asarray(rules.neutral_cuts)[band]
+    return (sentiment_score >= negative_cut).astype(np.int8) + (sentiment_score >= neutral_cut)
+
+
+def intervention_p(severity, rules=DEFAULT_RULES):
+    return severity / rules.intervention_divisor
+
+
+def score_arrays(risk_score, sentiment_score, hour, rules=DEFAULT_RULES):
+    """Score a batch of posts given as arrays; returns integer codes and floats by column."""
+    hour = np.asarray(hour)
+    risk, position = risk_codes(risk_score, rules)
+    severity = severity_scores(risk, position, hour, rules)
+    return {
+        'risk_level': risk,
+        'severity_score': severity,
+        'sentiment': sentiment_codes(severity, np.asarray(sentiment_score, dtype=np.float64), rules),
+        'intervention_p': intervention_p(severity, rules),
+    }
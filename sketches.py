@@ -0,0 +1,436 @@
+"""Approximate analytics from mergeable sketches kept per day, platform and risk level.
+
+    python sketches.py --rows 5000000
+
+Two questions are too expensive to answer exactly over the full archive:
+severity percentiles for any slice, and the most frequent phrases (word
+1..3-grams of the message text, millions of distinct ones). For every
+(day, platform, risk level) cell the store keeps
+
+- a KLL sketch of the severity scores,
+- a Count-Min sketch of phrase frequencies,
+- a Misra-Gries summary of that cell's heaviest phrases.
+
+All three merge, so any sidebar filter is answered by merging the cells it
+selects; no post is read again.
+
+Error bounds, for N posts (or phrase occurrences) in the selection:
+
+- Quantiles: the returned value's rank is within about eps*N of the
+  requested rank, eps = 2.296 / k**0.9723 (the published empirical fit for
+  KLL; 1.3% for k=200) with 99% confidence.
+- Phrase counts: the Count-Min estimate never undercounts and overcounts by
+  at most e/width * N with probability 1 - exp(-depth) (0.27% of N with
+  98% confidence for width 1024, depth 4).
+- Heavy hitters: every phrase occurring more than N/(m+1) times in the
+  selection is a candidate (m phrases kept per cell), so it is listed
+  whenever it belongs in the top K.
+"""
+import argparse
+import math
+import re
+import time
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from analytics import FilterState
+from cube import category_codes
+from data import PLATFORMS, RISK_LEVELS, iter_posts
+from keywords import APOSTROPHES
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Phrases are lower-case words without apostrophes, like the keyword matcher's;
+# an ASCII record separator splits messages
+TOKEN = re.compile(r"[a-z0-9'‘’ʼ`]+|\x1e")
+
+
+class KLL:
+    """Mergeable quantile sketch: levels of sorted compactors, level h items weigh 2**h."""
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, h):
+        return max(2, math.ceil(self.k * (2 / 3) ** (len(self.levels) - 1 - h)))
+
+    def _compress(self):
+        # Halve every level over capacity into the next one, lowest first, until all fit
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) <= self._capacity(h):
+                h += 1
+                continue
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            level = np.sort(level)
+            odd = len(level) % 2
+            promoted = level[odd + self._rng.integers(2)::2]
+            self.levels[h] = level[:odd]
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+        return self
+
+    @classmethod
+    def merge(cls, sketches, k=200, seed=0):
+        merged = cls(k, seed)
+        sketches = [sketch for sketch in sketches if sketch.n]
+        if not sketches:
+            return merged
+        height = max(len(sketch.levels) for sketch in sketches)
+        merged.levels = [
+            np.concatenate([sketch.levels[h] for sketch in sketches if h < len(sketch.levels)])
+            for h in range(height)
+        ]
+        merged.n = sum(sketch.n for sketch in sketches)
+        merged._compress()
+        return merged
+
+    def quantiles(self, qs=QUANTILES):
+        if not self.n:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cum = np.cumsum(weights[order])
+        rank = np.searchsorted(cum, np.asarray(qs) * cum[-1], side='left')
+        return items[order][np.minimum(rank, len(items) - 1)]
+
+    @property
+    def size(self):
+        return sum(len(level) for level in self.levels)
+
+
+def rank_error(k):
+    return 2.296 / k ** 0.9723
+
+
+def phrase_hashes(phrases):
+    # Stable 64-bit hash per phrase, split in two for the Count-Min rows
+    hashes = pd.util.hash_array(np.asarray(phrases, dtype=object))
+    return hashes & np.uint64(0xFFFFFFFF), (hashes >> np.uint64(32)) | np.uint64(1)
+
+
+def count_min_columns(phrases, depth, width):
+    # (phrase, depth) column per Count-Min row: double hashing h1 + i * h2
+    h1, h2 = phrase_hashes(phrases)
+    rows = np.arange(depth, dtype=np.uint64)
+    return ((h1[:, None] + rows[None, :] * h2[:, None]) % np.uint64(width)).astype(np.int64)
+
+
+def phrase_counts(messages, cells, max_n=3):
+    """Exact count of every 1..max_n word n-gram of the messages per cell: (cell, phrase, count).
+
+    Words are numbered once and an n-gram is an integer in base (vocabulary
+    + 1), so grouping never touches strings; only the distinct n-grams are
+    spelled out at the end.
+    """
+    text = '\x1e'.join(messages).lower()
+    tokens = np.array(TOKEN.findall(text), dtype=object)
+    breaks = tokens == '\x1e'
+    rows = np.cumsum(breaks)[~breaks]
+    ids, vocabulary = pd.factorize(tokens[~breaks])
+    # Apostrophes are dropped per distinct word, not per character of the text
+    merged, vocabulary = pd.factorize(np.array([word.translate(APOSTROPHES) for word in vocabulary], dtype=object))
+    ids = merged[ids]
+    keep = vocabulary[ids] != ''
+    ids, rows = ids[keep], rows[keep]
+    base = len(vocabulary) + 1
+    if base ** max_n >= 2**63:
+        raise ValueError(f'{len(vocabulary):,} distinct words overflow {max_n}-gram keys; use smaller chunks')
+
+    gram = ids.astype(np.int64) + 1
+    keys, owners = [gram], [rows]
+    for n in range(2, max_n + 1):
+        span = len(ids) - n + 1
+        if span <= 0:
+            break
+        # Extend every (n-1)-gram by the next word when both are in one message
+        gram = gram[:span] * base + ids[n - 1:] + 1
+        same = rows[:span] == rows[n - 1:]
+        keys.append(gram[same])
+        owners.append(rows[:span][same])
+    counts = pd.DataFrame({'cell': np.asarray(cells)[np.concatenate(owners)], 'key': np.concatenate(keys)})
+    counts = counts.groupby(['cell', 'key'], sort=False).size().reset_index(name='count')
+
+    unique, inverse = np.unique(counts['key'].to_numpy(), return_inverse=True)
+    words = np.append(np.array([''], dtype=object), vocabulary.astype(object))
+    spelled = words[unique % base]
+    rest = unique // base
+    while rest.any():
+        spelled = np.where(rest > 0, words[rest % base] + ' ', '') + spelled
+        rest //= base
+    return counts['cell'].to_numpy(), spelled[inverse], counts['count'].to_numpy()
+
+
+class SketchStore:
+    """Severity and phrase sketches per (day, platform, risk level), filled chunk by chunk."""
+
+    def __init__(self, k=200, width=1024, depth=4, heavy=64, max_n=3):
+        self.k = k
+        self.width = width
+        self.depth = depth
+        self.heavy = heavy
+        self.max_n = max_n
+        # (day, platform, risk) -> KLL of severity scores
+        self.severity = {}
+        # day -> (platform, risk, depth, width) Count-Min counters and (platform, risk) phrase totals
+        self.counters = {}
+        self.totals = {}
+        # day -> Misra-Gries summaries of that day's cells: day, platform, risk, phrase, count
+        self.heavy_by_day = {}
+        self._heavy_hitters = None
+        self.rows = 0
+
+    def add(self, df):
+        if not len(df):
+            return self
+        day = df['date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+        # Cells of this chunk, numbered from its first day
+        first = day.min()
+        shape = (int(day.max() - first) + 1, len(PLATFORMS), len(RISK_LEVELS))
+        cell = np.ravel_multi_index((day - first, category_codes(df['platform'], PLATFORMS),
+                                     category_codes(df['risk_level'], RISK_LEVELS)), shape)
+        self._add_severity(cell, shape, first, df['severity_score'].to_numpy(dtype=np.float64))
+
+        if 'message' in df.columns:
+            cells, phrase, count = phrase_counts(df['message'].fillna('').tolist(), cell, self.max_n)
+        else:
+            # Without text the drawn keyword is the only phrase of a post
+            counts = pd.DataFrame({'cell': cell, 'phrase': df['keyword'].astype(object)}).dropna()
+            counts = counts.groupby(['cell', 'phrase'], sort=False).size().reset_index(name='count')
+            cells, phrase, count = counts['cell'].to_numpy(), counts['phrase'].to_numpy(), counts['count'].to_numpy()
+        self._add_phrases(cells, shape, first, phrase, count)
+        self.rows += len(df)
+        return self
+
+    def _add_severity(self, cell, shape, first, severity):
+        # One sorted pass groups the rows by cell; each cell's sketch takes its slice at once
+        order = np.argsort(cell, kind='stable')
+        cells, starts = np.unique(cell[order], return_index=True)
+        day, platform, risk = np.unravel_index(cells, shape)
+        for i, (start, stop) in enumerate(zip(starts, np.append(starts[1:], len(order)))):
+            key = (int(first + day[i]), int(platform[i]), int(risk[i]))
+            sketch = self.severity.get(key)
+            if sketch is None:
+                sketch = self.severity[key] = KLL(self.k, seed=key)
+            sketch.update(severity[order[start:stop]])
+
+    def _add_phrases(self, cells, shape, first, phrase, count):
+        # Count-Min counters of every cell in one bincount, then added to each day's table
+        columns = count_min_columns(phrase, self.depth, self.width)
+        table_shape = shape + (self.depth, self.width)
+        index = (np.repeat(cells, self.depth) * self.depth + np.tile(np.arange(self.depth), len(cells))) * self.width
+        tables = np.bincount(index + columns.ravel(), weights=np.repeat(count, self.depth),
+                             minlength=int(np.prod(table_shape))).reshape(table_shape)
+        totals = np.bincount(cells, weights=count, minlength=int(np.prod(shape))).reshape(shape)
+        for d in np.flatnonzero(totals.sum(axis=(1, 2))):
+            day = int(first + d)
+            if day in self.counters:
+                self.counters[day] += tables[d].astype(np.uint32)
+                self.totals[day] += totals[d].astype(np.int64)
+            else:
+                self.counters[day] = tables[d].astype(np.uint32)
+                self.totals[day] = totals[d].astype(np.int64)
+
+        day, platform, risk = np.unravel_index(cells, shape)
+        counts = pd.DataFrame({'day': first + day, 'platform': platform, 'risk': risk, 'phrase': phrase, 'count': count})
+        self._merge_heavy(counts)
+
+    def merge(self, other):
+        """Fold another store's sketches (e.g. a worker's share of the archive) into this one."""
+        for key, sketch in other.severity.items():
+            mine = self.severity.get(key)
+            self.severity[key] = sketch if mine is None else KLL.merge([mine, sketch], self.k, seed=key)
+        for d, table in other.counters.items():
+            if d in self.counters:
+                self.counters[d] += table
+                self.totals[d] += other.totals[d]
+            else:
+                self.counters[d], self.totals[d] = table.copy(), other.totals[d].copy()
+        self._merge_heavy(other.heavy_hitters)
+        self.rows += other.rows
+        return self
+
+    @property
+    def nbytes(self):
+        return (sum(sketch.size * 8 for sketch in self.severity.values())
+                + sum(table.nbytes for table in self.counters.values())
+                + sum(int(frame.memory_usage(deep=True).sum()) for frame in self.heavy_by_day.values()))
+
+    @property
+    def heavy_hitters(self):
+        # Summaries of every cell in one frame, rebuilt only after an add or merge
+        if self._heavy_hitters is None:
+            frames = [self.heavy_by_day[d] for d in sorted(self.heavy_by_day)]
+            self._heavy_hitters = (pd.concat(frames, ignore_index=True) if frames else
+                                   pd.DataFrame({'day': [], 'platform': [], 'risk': [], 'phrase': [], 'count': []}))
+        return self._heavy_hitters
+
+    def _merge_heavy(self, counts):
+        # Only the days the new counts touch are merged and pruned again, so each chunk costs its own size
+        if not len(counts):
+            return
+        days = pd.unique(counts['day'].to_numpy())
+        touched = [self.heavy_by_day.pop(d) for d in days if d in self.heavy_by_day]
+        merged = misra_gries(pd.concat(touched + [counts], ignore_index=True), self.heavy)
+        day = merged['day'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+        for start, stop in zip(starts, np.r_[starts[1:], len(day)]):
+            self.heavy_by_day[day[start]] = merged.iloc[start:stop].reset_index(drop=True)
+        self._heavy_hitters = None
+
+
+def misra_gries(counts, m):
+    """Merge (cell, phrase, count) rows into at most m phrases per cell.
+
+    Counts are summed per phrase, then the (m+1)-th largest count of each
+    cell is subtracted from all of its phrases; what stays positive is kept.
+    """
+    counts = counts.groupby(['day', 'platform', 'risk', 'phrase'], sort=False)['count'].sum().reset_index()
+    counts = counts.sort_values(['day', 'platform', 'risk', 'count'], ascending=[True, True, True, False])
+    rank = counts.groupby(['day', 'platform', 'risk'], sort=False).cumcount().to_numpy()
+    cut = counts['count'].where(rank == m).groupby([counts['day'], counts['platform'], counts['risk']]).transform('max')
+    counts['count'] -= cut.fillna(0).astype(counts['count'].dtype)
+    return counts[(rank < m) & (counts['count'] > 0).to_numpy()].reset_index(drop=True)
+
+
+class SketchStats:
+    """Approximate tab tables for one filter state, merged from the selected cells on first access."""
+
+    def __init__(self, store, filters, top_k=20):
+        self.store = store
+        self.filters = filters
+        self.top_k = top_k
+        first = np.datetime64(filters.date_from, 'D').astype(np.int64)
+        last = np.datetime64(filters.date_to, 'D').astype(np.int64)
+        self.days = (first, last)
+        self.platforms = [PLATFORMS.index(p) for p in filters.platforms]
+        self.risk_levels = [RISK_LEVELS.index(r) for r in filters.risk_levels]
+
+    def _cells(self):
+        first, last = self.days
+        return [(key, sketch) for key, sketch in self.store.severity.items()
+                if first <= key[0] <= last and key[1] in self.platforms and key[2] in self.risk_levels]
+
+    @property
+    def rank_error(self):
+        return rank_error(self.store.k)
+
+    @cached_property
+    def severity_percentiles(self):
+        rows = []
+        for p in self.platforms:
+            sketch = KLL.merge([s for key, s in self._cells() if key[1] == p], self.store.k)
+            if sketch.n:
+                rows.append([PLATFORMS[p], sketch.n, *sketch.quantiles()])
+        return pd.DataFrame(rows, columns=['Platform', 'Posts'] + [f'p{round(q * 100)}' for q in QUANTILES])
+
+    @cached_property
+    def daily_percentiles(self):
+        by_day = {}
+        for key, sketch in self._cells():
+            by_day.setdefault(key[0], []).append(sketch)
+        days = sorted(by_day)
+        values = [KLL.merge(by_day[d], self.store.k).quantiles() for d in days]
+        frame = pd.DataFrame(values, columns=[f'p{round(q * 100)}' for q in QUANTILES])
+        frame.insert(0, 'date', pd.to_datetime(np.array(days, dtype='datetime64[D]')))
+        return frame
+
+    @cached_property
+    def _phrase_counts(self):
+        # Count-Min counters and phrase total of the selection
+        first, last = self.days
+        table = np.zeros((self.store.depth, self.store.width), dtype=np.int64)
+        total = 0
+        keep = np.ix_(self.platforms, self.risk_levels)
+        for d in range(first, last + 1):
+            if d in self.store.counters:
+                table += self.store.counters[d][keep].sum(axis=(0, 1), dtype=np.int64)
+                total += int(self.store.totals[d][keep].sum())
+        return table, total
+
+    @property
+    def phrase_total(self):
+        return self._phrase_counts[1]
+
+    @property
+    def phrase_error(self):
+        # Count-Min overcount bound (probability 1 - exp(-depth))
+        return math.e / self.store.width * self.phrase_total
+
+    @property
+    def phrase_confidence(self):
+        return 1 - math.exp(-self.store.depth)
+
+    @property
+    def heavy_threshold(self):
+        # Phrases more frequent than this are guaranteed to be candidates
+        return self.phrase_total / (self.store.heavy + 1)
+
+    @cached_property
+    def top_phrases(self):
+        first, last = self.days
+        heavy = self.store.heavy_hitters
+        selected = heavy[heavy['day'].between(first, last) & heavy['platform'].isin(self.platforms)
+                         & heavy['risk'].isin(self.risk_levels)]
+        candidates = selected['phrase'].unique()
+        if not len(candidates):
+            return pd.DataFrame({'Phrase': [], 'Estimate': [], 'Words': []})
+        table, _ = self._phrase_counts
+        columns = count_min_columns(candidates, self.store.depth, self.store.width)
+        estimate = table[np.arange(self.store.depth)[None, :], columns].min(axis=1)
+        top = np.argsort(-estimate, kind='stable')[:self.top_k]
+        return pd.DataFrame({
+            'Phrase': candidates[top],
+            'Estimate': estimate[top],
+            'Words': [phrase.count(' ') + 1 for phrase in candidates[top]],
+        })
+
+
+def build_sketches(chunks, k=200, width=1024, depth=4, heavy=64, max_n=3):
+    store = SketchStore(k, width, depth, heavy, max_n)
+    for chunk in chunks:
+        store.add(chunk)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sketch synthetic posts and print the approximate tables for all of them')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-rows', type=int, default=500_000)
+    parser.add_argument('--k', type=int, default=200, help='KLL accuracy parameter')
+    parser.add_argument('--width', type=int, default=1024, help='Count-Min counters per row')
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    chunks = iter_posts(args.rows, chunk_size=args.chunk_rows, compact=True, text=True)
+    store = build_sketches(chunks, k=args.k, width=args.width)
+    built = time.perf_counter() - start
+    first, last = min(store.counters), max(store.counters)
+    filters = FilterState.from_sidebar(PLATFORMS, RISK_LEVELS, tuple(np.array([first, last], dtype='datetime64[D]')))
+    stats = SketchStats(store, filters, args.top)
+
+    with pd.option_context('display.width', 120):
+        print(stats.severity_percentiles.to_string(index=False), end='\n\n')
+        print(stats.top_phrases.to_string(index=False), end='\n\n')
+    print(f"{store.rows:,} posts sketched in {built:.1f} s, {store.nbytes / 2**20:.1f} MB; "
+          f"rank error <= {stats.rank_error:.2%}, phrase overcount <= {stats.phrase_error:,.0f} "
+          f"of {stats.phrase_total:,} phrases")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""Loading the dashboard's data, and getting a fresh process to its first paint fast.
+
+    python startup.py        # warm-up hook: fill the disk cache before serving
+
+The posts frame and the cube are read from (or built into) the shared disk
+cache. Every cube build also stores a small Summary of the default
+selection (date bounds, platforms and the metric card values) under a key
+that does not change with the data version. A new process can therefore
+paint the header, sidebar and metric cards from the latest summary while
+the cube loads on a background thread. Run this module before a replica
+receives traffic (e.g. as its start command's first step) so the cube is
+already cached when the first session arrives.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+import config
+from analytics import FilterState, summarize
+from cache import DiskCache, cache_key, dataset_version
+from cube import build_cube, build_cube_from_chunks
+from data import generate_posts, iter_posts
+from dataset import chunk_rows_for, has_text, iter_frames, open_dataset, read_posts
+from parallel import build_cube_parallel, build_cube_parallel_dataset
+
+# DashboardStats values the sidebar and metric cards show for the default selection
+SUMMARY_FIELDS = ['total_posts', 'overall_posts', 'high_risk', 'interventions', 'avg_severity',
+                  'overall_avg_severity', 'share_of_total', 'high_risk_share', 'intervention_rate']
+
+# Chunk memory when SPA_MEMORY_MB is unset, for the paths that stream chunks anyway
+CHUNK_MB = 256
+
+
+def open_disk_cache():
+    return DiskCache(config.CACHE_DIR, config.CACHE_MB) if config.CACHE_DIR else None
+
+
+def data_params():
+    # Everything that determines the data, used as the disk cache key (chunk sizes do not: see data.iter_posts)
+    if config.DATA_PATH:
+        return {'path': os.path.abspath(config.DATA_PATH), 'version': dataset_version(config.DATA_PATH)}
+    return {
+        'n_rows': config.DATA_ROWS,
+        'n_days': config.DATA_DAYS,
+        'seed': config.DATA_SEED,
+        'end': pd.Timestamp.now().normalize(),
+        'text': config.DATA_TEXT,
+    }
+
+
+def build_data(params):
+    # The resident frame keeps the matched keyword mask but never the message text
+    if config.DATA_PATH:
+        columns = [c for c in open_dataset(config.DATA_PATH).schema.names if c != 'message']
+        return read_posts(config.DATA_PATH, columns)
+    if params['text']:
+        # Chunked as data_chunks() is, so the phrase sketches see the same posts
+        chunks = [chunk.drop(columns='message') for chunk in data_chunks(params, config.DATA_COMPACT)]
+        if chunks:
+            return pd.concat(chunks, ignore_index=True)
+    return generate_posts(**params, compact=config.DATA_COMPACT)
+
+
+def text_data(params):
+    # Whether the posts carry message text: a dataset's own columns, else SPA_TEXT
+    return has_text(config.DATA_PATH) if config.DATA_PATH else params['text']
+
+
+def data_chunks(params, compact=True):
+    # Posts in chunks bounded by SPA_MEMORY_MB (else CHUNK_MB), never all in memory at once
+    chunk_rows = chunk_rows_for(config.DATA_MEMORY_MB or CHUNK_MB, text_data(params))
+    if config.DATA_PATH:
+        return iter_frames(config.DATA_PATH, chunk_rows)
+    return iter_posts(**params, chunk_size=chunk_rows, compact=compact)
+
+
+def sketch_chunks(params, load_data):
+    """Posts for the approximate mode's sketches, in chunks bounded like data_chunks().
+
+    Message text is only ever streamed from the source; without it the
+    resident frame is sliced instead of read again.
+    """
+    if config.DATA_MEMORY_MB or text_data(params):
+        return data_chunks(params)
+    df = load_data()
+    chunk_rows = chunk_rows_for(CHUNK_MB)
+    return (df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows))
+
+
+def read_data(disk_cache, params):
+    if disk_cache is None:
+        return build_data(params)
+    key = cache_key(kind='posts', compact=config.DATA_COMPACT, message=False, **params)
+    df = disk_cache.get_frame(key)
+    if df is None:
+        df = build_data(params)
+        disk_cache.put_frame(key, df)
+    return df
+
+
+def build_cube_for(params, load_data):
+    # Worker threads, not processes: forking the multi-threaded server can deadlock on a lock
+    # another thread holds, and spawned children re-run the app script Streamlit installs as __main__
+    if config.DATA_WORKERS > 1:
+        if config.DATA_PATH:
+            chunk_rows = chunk_rows_for(config.DATA_MEMORY_MB, text_data(params)) if config.DATA_MEMORY_MB else 1_000_000
+            return build_cube_parallel_dataset(config.DATA_PATH, config.DATA_WORKERS, chunk_rows, threads=True)
+        return build_cube_parallel(load_data(), config.DATA_WORKERS, threads=True)
+    if config.DATA_MEMORY_MB:
+        # Out-of-core: aggregate bounded chunks without ever holding all rows
+        return build_cube_from_chunks(data_chunks(params))
+    return build_cube(load_data())
+
+
+def read_cube(disk_cache, params, load_data):
+    """Cube from the disk cache, or built (from load_data() when it needs the rows) and stored."""
+    if disk_cache is None:
+        return build_cube_for(params, load_data)
+    key = cache_key(kind='cube', **params)
+    cube = disk_cache.get_cube(key)
+    if cube is None:
+        cube = build_cube_for(params, load_data)
+        disk_cache.put_cube(key, cube)
+    summary = read_summary(disk_cache, params)
+    if summary is None or not summary.current:
+        write_summary(disk_cache, params, Summary.from_cube(cube))
+    return cube
+
+
+class Summary:
+    """The default selection's headline values; stands in for the cube and DashboardStats at first paint."""
+
+    def __init__(self, values):
+        self.values = values
+        self.platforms = values['platforms']
+        self.first_date = pd.Timestamp(values['first_date'])
+        self.last_date = pd.Timestamp(values['last_date'])
+        self.built_at = pd.Timestamp(values['built_at'], unit='s')
+        # False when it was computed from an earlier version of the data
+        self.current = True
+        for name in SUMMARY_FIELDS:
+            setattr(self, name, values[name])
+
+    @classmethod
+    def from_cube(cls, cube):
+        stats = summarize(cube, FilterState.everything(cube))
+        values = {
+            'platforms': cube.platforms,
+            'first_date': cube.first_date.isoformat(),
+            'last_date': cube.last_date.isoformat(),
+            'built_at': time.time(),
+        }
+        for name in SUMMARY_FIELDS:
+            # Counts stay ints, NumPy ratios become plain floats
+            value = getattr(stats, name)
+            values[name] = value if isinstance(value, int) else float(value)
+        return cls(values)
+
+
+def summary_key(params):
+    # One key per data source across versions (and days), so a new process finds the latest summary
+    return cache_key(kind='summary', **{name: value for name, value in params.items() if name not in ('end', 'version')})
+
+
+def read_summary(disk_cache, params):
+    """Latest Summary of this data source and whether it is of the current data, or None."""
+    if disk_cache is None:
+        return None
+    values = disk_cache.get_json(summary_key(params), 'summary.json')
+    if values is None:
+        return None
+    summary = Summary(values)
+    summary.current = values.get('params') == cache_key(kind='cube', **params)
+    return summary
+
+
+def write_summary(disk_cache, params, summary):
+    disk_cache.put_json(summary_key(params), 'summary.json', {**summary.values, 'params': cache_key(kind='cube', **params)})
+
+
+class BackgroundTask:
+    """Runs target(*args) once on a daemon thread; result() waits for it and re-raises its error."""
+
+    def __init__(self, target, *args, name='background-task'):
+        self._done = threading.Event()
+        self._result = None
+        self._error = None
+        self.started = time.perf_counter()
+        self.seconds = None
+        threading.Thread(target=self._run, args=(target, args), name=name, daemon=True).start()
+
+    def _run(self, target, args):
+        try:
+            self._result = target(*args)
+        except BaseException as error:
+            self._error = error
+        finally:
+            self.seconds = time.perf_counter() - self.started
+            self._done.set()
+
+    @property
+    def ready(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def result(self):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill the disk cache (cube and first-paint summary) before serving')
+    parser.add_argument('--posts', action='store_true', help='also cache the posts frame (approximate mode, worker pools)')
+    args = parser.parse_args()
+
+    disk_cache = open_disk_cache()
+    if disk_cache is None:
+        parser.error('the disk cache is disabled (SPA_CACHE_DIR is empty): there is nothing to warm')
+    params = data_params()
+    start = time.perf_counter()
+    if args.posts:
+        read_data(disk_cache, params)
+    cube = read_cube(disk_cache, params, lambda: read_data(disk_cache, params))
+    summary = read_summary(disk_cache, params)
+    print(json.dumps({
+        'seconds': round(time.perf_counter() - start, 2),
+        'posts': round(summary.total_posts),
+        'days': cube.n_days,
+        'cache': disk_cache.root,
+    }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,412 @@
+"""Streaming ingestion: fold newly scored posts into a rolling cube.
+
+    python stream.py produce /tmp/posts.jsonl --rate 5000 --seconds 60
+    python stream.py consume /tmp/posts.jsonl
+    SPA_STREAM=/tmp/posts.jsonl streamlit run app.py
+
+Posts arrive as JSON lines (timestamp, platform, risk_level, severity_score,
+sentiment, intervention and keyword or message, optionally sent_at in epoch
+seconds). Posts with raw risk_score and sentiment_score instead of the scored
+columns go through the scoring rules (scoring.py) on the way in, and
+malformed lines are counted as dropped. The file is tailed and its lines
+collected into micro-batches, cut when enough rows are waiting or the
+oldest has waited long enough. Each batch is aggregated with
+cube_tables and added in place to a ring of per-day buckets holding the last
+retention_days days, so counts, severity sums, interventions, hourly and
+keyword stats stay current without touching earlier rows. Opening a new day
+zeroes the one bucket it reuses, which expires the oldest day in O(1) per
+bucket. Readers take a Cube snapshot, rebuilt only when the version changes.
+"""
+import argparse
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.json as pa_json
+
+from cube import COUNT, KEYWORDS_AXES, MEASURES, POSTS_AXES, Cube, cube_tables
+from data import CATEGORY_DTYPES, KEYWORDS, compact_frame, draw_columns, tag_keywords, to_frame
+from profiling import percentiles
+from scoring import DEFAULT_RULES, load_rules, score_arrays
+
+# Largest read from the file at once
+BATCH_BYTES = 8 * 2**20
+
+# Scored columns that come back from the rules as category codes
+SCORED_CATEGORIES = ['risk_level', 'sentiment']
+
+# What a malformed line (bad JSON, missing or mistyped fields) raises from records_frame
+PARSE_ERRORS = (pa.ArrowException, KeyError, TypeError, ValueError)
+
+
+class LiveCube:
+    """Per-day cube tables for a rolling window, updated in place by micro-batches."""
+
+    def __init__(self, retention_days=180):
+        self.retention = retention_days
+        self.posts = np.zeros((retention_days,) + POSTS_AXES + (MEASURES,))
+        self.keywords = np.zeros((retention_days,) + KEYWORDS_AXES + (MEASURES,))
+        self.last_day = None
+        self.version = 0
+        self.rows = 0
+        self.dropped = 0
+        self.busy_seconds = 0.0
+        # (version, arrival time) of batches no dashboard has shown yet; bounded, as only
+        # open sessions drain it and ingestion goes on without them
+        self.pending = deque(maxlen=1000)
+        self.latencies = deque(maxlen=1000)
+        self.arrivals = deque()
+        self._snapshot = (None, None)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_cube(cls, cube, retention_days=180):
+        live = cls(retention_days)
+        if cube.n_days:
+            live.add_tables(cube.start, np.asarray(cube.posts), np.asarray(cube.keywords))
+        return live
+
+    def _advance(self, day):
+        # Open the buckets up to day, zeroing the expired days they reuse
+        if self.last_day is None:
+            self.last_day = day
+            return
+        for opened in range(max(self.last_day + 1, day - self.retention + 1), day + 1):
+            self.posts[opened % self.retention] = 0
+            self.keywords[opened % self.retention] = 0
+        self.last_day = max(self.last_day, day)
+
+    def add_tables(self, start, posts, keywords):
+        days = int(np.datetime64(start, 'D').astype(np.int64)) + np.arange(len(posts))
+        with self._lock:
+            self._advance(int(days[-1]))
+            # Days that already fell out of the window are dropped
+            keep = days > self.last_day - self.retention
+            slots = days[keep] % self.retention
+            self.posts[slots] += posts[keep]
+            self.keywords[slots] += keywords[keep]
+            self.version += 1
+            return self.version
+
+    def add(self, df, arrived=None, parse_seconds=0.0, dropped=0):
+        """Fold a posts frame into the window; arrived is when its oldest post arrived.
+
+        dropped counts the batch's rows that could not be parsed or placed (see parse_records).
+        """
+        start = time.perf_counter() - parse_seconds
+        if len(df):
+            version = self.add_tables(*cube_tables(df))
+        else:
+            version = self.version
+        now = time.time()
+        with self._lock:
+            self.rows += len(df)
+            self.dropped += dropped
+            self.busy_seconds += time.perf_counter() - start
+            self.pending.append((version, arrived if arrived is not None else now))
+            self.arrivals.append((now, len(df)))
+            while self.arrivals and self.arrivals[0][0] < now - 60:
+                self.arrivals.popleft()
+
+    def snapshot(self):
+        """(version, Cube) of the current window, oldest day first."""
+        with self._lock:
+            version, cube = self._snapshot
+            if version == self.version:
+                return version, cube
+            version = self.version
+            if self.last_day is None:
+                first, order = 0, []
+            else:
+                first = self.last_day - self.retention + 1
+                order = np.arange(first, self.last_day + 1) % self.retention
+            posts, keywords = self.posts[order], self.keywords[order]
+        cube = Cube(np.datetime64(first, 'D'), posts, keywords)
+        with self._lock:
+            self._snapshot = (version, cube)
+        return version, cube
+
+    def mark_visible(self, version):
+        # Batches up to version are now on screen: record their arrival-to-visible latency
+        now = time.time()
+        with self._lock:
+            while self.pending and self.pending[0][0] <= version:
+                self.latencies.append(now - self.pending.popleft()[1])
+
+    @property
+    def throughput(self):
+        # Posts per second the ingest path can parse and fold in (busy time only)
+        return self.rows / self.busy_seconds if self.busy_seconds else 0.0
+
+    @property
+    def arrival_rate(self):
+        # Posts per second over the last minute
+        with self._lock:
+            if not self.arrivals:
+                return 0.0
+            span = max(time.time() - self.arrivals[0][0], 1.0)
+            return sum(rows for _, rows in self.arrivals) / span
+
+    def latency_percentiles(self):
+        with self._lock:
+            return percentiles(list(self.latencies))
+
+
+def score_frame(df, rules=DEFAULT_RULES):
+    """Replace raw risk_score / sentiment_score columns with the scored post columns.
+
+    Intervention is only known once a responder acted, so posts that do not
+    report it count as no intervention; intervention_p keeps the likelihood.
+    """
+    scores = score_arrays(df.pop('risk_score').to_numpy(dtype=np.float64),
+                          df.pop('sentiment_score').to_numpy(dtype=np.float64),
+                          df['hour'].to_numpy(), rules)
+    for name in SCORED_CATEGORIES:
+        scores[name] = pd.Categorical.from_codes(scores[name], dtype=CATEGORY_DTYPES[name])
+    if 'intervention' not in df.columns:
+        df['intervention'] = False
+    return df.assign(**scores)
+
+
+def score_record_batch(batch, rules=DEFAULT_RULES):
+    """Arrow record batch (risk_score, sentiment_score, hour, ...) with the scored columns appended.
+
+    Risk level and sentiment come back dictionary-encoded on the known categories.
+    """
+    scores = score_arrays(batch.column('risk_score').to_numpy(), batch.column('sentiment_score').to_numpy(),
+                          batch.column('hour').to_numpy(), rules)
+    columns = dict(zip(batch.schema.names, batch.columns))
+    for name, values in scores.items():
+        if name in SCORED_CATEGORIES:
+            values = pa.DictionaryArray.from_arrays(values, list(CATEGORY_DTYPES[name].categories))
+        columns[name] = values
+    return pa.RecordBatch.from_pydict(columns)
+
+
+def records_frame(buffer, rules=DEFAULT_RULES):
+    """Compact posts frame, earliest sent_at (or None) and rows dropped, from a JSON lines buffer.
+
+    Raw lines (risk_score, no risk_level) are scored even when the batch mixes them with scored ones.
+    """
+    table = pa_json.read_json(io.BytesIO(buffer))
+    df = table.to_pandas()
+    timestamps = pd.to_datetime(df.pop('timestamp'))
+    df['date'] = timestamps.dt.normalize()
+    df['hour'] = timestamps.dt.hour
+    sent_at = df.pop('sent_at').min() if 'sent_at' in df.columns else None
+    if 'risk_score' in df.columns:
+        raw = df['risk_level'].isna().to_numpy() if 'risk_level' in df.columns else np.ones(len(df), dtype=bool)
+        if raw.all():
+            df = score_frame(df.drop(columns=['risk_level', 'severity_score', 'sentiment'], errors='ignore'), rules)
+        else:
+            scored = score_frame(df[raw].drop(columns=['risk_level', 'severity_score', 'sentiment']), rules)
+            df = pd.concat([df[~raw].drop(columns=['risk_score', 'sentiment_score']), scored]).sort_index()
+    if 'message' in df.columns and 'keyword' not in df.columns:
+        codes, df['keyword_mask'] = tag_keywords(df['message'].fillna('').tolist())
+        df['keyword'] = np.array(KEYWORDS + [None], dtype=object)[codes]
+    df = compact_frame(df)
+    # Rows with a platform, risk level or sentiment outside the known categories cannot be placed
+    known = df[[name for name in CATEGORY_DTYPES if name != 'keyword']].notna().all(axis=1)
+    return df[known], sent_at, int((~known).sum())
+
+
+def parse_records(buffer, rules=DEFAULT_RULES):
+    """records_frame() for a batch that may hold malformed lines.
+
+    A batch that fails to parse is split in halves until the bad lines are
+    isolated; those count as dropped and the rest are folded in as usual.
+    """
+    try:
+        return records_frame(buffer, rules)
+    except PARSE_ERRORS:
+        lines = [line for line in buffer.splitlines(keepends=True) if line.strip()]
+        if len(lines) <= 1:
+            return empty_frame(), None, len(lines)
+    half = len(lines) // 2
+    parts = [parse_records(b''.join(lines[:half]), rules), parse_records(b''.join(lines[half:]), rules)]
+    frames = [df for df, _, _ in parts if len(df)]
+    sent = [sent_at for _, sent_at, _ in parts if sent_at is not None]
+    df = pd.concat(frames, ignore_index=True) if frames else empty_frame()
+    return df, min(sent) if sent else None, sum(dropped for _, _, dropped in parts)
+
+
+def empty_frame():
+    return to_frame(np.array([], dtype='datetime64[ns]'), draw_columns(np.random.default_rng(0), 0), compact=True)
+
+
+class MicroBatcher:
+    """Collects items and hands them to handler as one list once max_rows rows
+    are waiting or the oldest item has waited max_latency seconds."""
+
+    def __init__(self, handler, max_rows=100_000, max_latency=0.1):
+        self.handler = handler
+        self.max_rows = max_rows
+        self.max_latency = max_latency
+        self.items = []
+        self.rows = 0
+        self.oldest = None
+        self.batches = 0
+
+    def add(self, item, rows, now=None):
+        now = now if now is not None else time.monotonic()
+        if not self.items:
+            self.oldest = now
+        self.items.append(item)
+        self.rows += rows
+        return self.poll(now)
+
+    def poll(self, now=None):
+        # Flush if either trigger fired; returns the handler's result, else None
+        now = now if now is not None else time.monotonic()
+        if self.items and (self.rows >= self.max_rows or now - self.oldest >= self.max_latency):
+            return self.flush()
+        return None
+
+    def flush(self):
+        if not self.items:
+            return None
+        items, self.items, self.rows, self.oldest = self.items, [], 0, None
+        self.batches += 1
+        return self.handler(items)
+
+
+class LineTail:
+    """Reads the complete JSON lines appended to a file since the last read."""
+
+    def __init__(self, path, from_start=True):
+        self.path = path
+        self.from_start = from_start
+        self.file = None
+        self.partial = b''
+
+    def read(self):
+        if self.file is None:
+            if not os.path.exists(self.path):
+                return b''
+            self.file = open(self.path, 'rb')
+            if not self.from_start:
+                self.file.seek(0, os.SEEK_END)
+        chunk = self.file.read(BATCH_BYTES)
+        if not chunk:
+            return b''
+        chunk = self.partial + chunk
+        cut = chunk.rfind(b'\n') + 1
+        self.partial = chunk[cut:]
+        return chunk[:cut]
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def ingest(live, path, stop=None, poll=0.2, rules=DEFAULT_RULES, max_rows=100_000, max_latency=0.1):
+    """Fold the posts appended to path into live in micro-batches until stop is set.
+
+    Without a stop event it returns at the end of the file.
+    """
+    def fold(items):
+        start = time.perf_counter()
+        df, sent_at, dropped = parse_records(b''.join(buffer for buffer, _ in items), rules)
+        live.add(df, sent_at if sent_at is not None else items[0][1], time.perf_counter() - start, dropped)
+
+    batcher = MicroBatcher(fold, max_rows, max_latency)
+    tail = LineTail(path)
+    try:
+        while stop is None or not stop.is_set():
+            buffer = tail.read()
+            if buffer:
+                batcher.add((buffer, time.time()), buffer.count(b'\n'))
+                continue
+            batcher.poll()
+            if stop is None:
+                if tail.file is not None:
+                    break
+                time.sleep(poll)
+            else:
+                # Wake in time for the latency trigger of a waiting batch
+                stop.wait(min(poll, max_latency) if batcher.items else poll)
+        batcher.flush()
+    finally:
+        tail.close()
+
+
+def start_ingest(live, path, poll=0.2, rules=DEFAULT_RULES, max_rows=100_000, max_latency=0.1):
+    stop = threading.Event()
+    thread = threading.Thread(target=ingest, args=(live, path, stop, poll, rules, max_rows, max_latency),
+                              name='stream-ingest', daemon=True)
+    thread.start()
+    return stop
+
+
+def produce(path, rate, seconds, seed=0, raw=False):
+    # Append synthetic scored posts (raw: model scores only) at about rate posts per second
+    rng = np.random.default_rng(seed)
+    interval = 0.1
+    deadline = time.time() + seconds
+    with open(path, 'a') as f:
+        while time.time() < deadline:
+            tick = time.time()
+            n = max(int(rate * interval), 1)
+            df = to_frame(np.full(n, np.datetime64('today', 'ns')), draw_columns(rng, n))
+            df['timestamp'] = (df.pop('date') + pd.to_timedelta(df.pop('hour'), unit='h')).dt.strftime('%Y-%m-%dT%H:%M:%S')
+            if raw:
+                df = df.drop(columns=['risk_level', 'severity_score', 'sentiment', 'intervention'])
+                df['risk_score'] = rng.random(n)
+                df['sentiment_score'] = rng.random(n)
+            df['sent_at'] = time.time()
+            f.write(df.to_json(orient='records', lines=True))
+            f.flush()
+            time.sleep(max(0.0, interval - (time.time() - tick)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Produce or consume a JSON lines stream of scored posts')
+    commands = parser.add_subparsers(dest='command', required=True)
+    produce_parser = commands.add_parser('produce', help='append synthetic posts to a JSON lines file')
+    produce_parser.add_argument('path')
+    produce_parser.add_argument('--rate', type=int, default=1000, help='posts per second')
+    produce_parser.add_argument('--seconds', type=float, default=60)
+    produce_parser.add_argument('--raw', action='store_true', help='write risk_score / sentiment_score for the scoring stage')
+    consume_parser = commands.add_parser('consume', help='tail a JSON lines file and report throughput and latency')
+    consume_parser.add_argument('path')
+    consume_parser.add_argument('--days', type=int, default=180, help='retention window')
+    consume_parser.add_argument('--rules', help='JSON file overriding the scoring rules')
+    consume_parser.add_argument('--batch-rows', type=int, default=100_000, help='rows that cut a micro-batch')
+    consume_parser.add_argument('--batch-latency', type=float, default=0.1, help='seconds that cut a micro-batch')
+    consume_parser.add_argument('--report-every', type=float, default=5)
+    args = parser.parse_args()
+
+    if args.command == 'produce':
+        produce(args.path, args.rate, args.seconds, raw=args.raw)
+        return
+
+    live = LiveCube(args.days)
+    start_ingest(live, args.path, rules=load_rules(args.rules), max_rows=args.batch_rows, max_latency=args.batch_latency)
+    try:
+        while True:
+            time.sleep(args.report_every)
+            # Stand-in for a dashboard rerun: take the snapshot and read a metric off it
+            version, cube = live.snapshot()
+            total = int(cube.totals()[COUNT])
+            live.mark_visible(version)
+            latency = live.latency_percentiles()
+            print(json.dumps({
+                'posts': total,
+                'dropped': live.dropped,
+                'ingest_posts_per_s': round(live.throughput),
+                'arrival_posts_per_s': round(live.arrival_rate),
+                'latency_p50_ms': round(latency[0.5] * 1000, 1),
+                'latency_p99_ms': round(latency[0.99] * 1000, 1),
+            }), flush=True)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()